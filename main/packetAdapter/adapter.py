@@ -2,7 +2,7 @@ import random
 
 import pandas as pd
 
-from main.packetAdapter.helpers import changeItemOrientation
+from main.packetAdapter.helpers import changeItemOrientation, getOrientationTable, getDistinctOrientations
 from main.packetOptimization.constructivePhase.geometryHelpers import getBottomPlaneArea
 
 
@@ -29,6 +29,13 @@ def areTaxed(items):
 
 
 # ------------------- Orientation -------------------------------
+# This function adds to an item its dimensions in each orientation and its geometrically distinct feasible orientations.
+def setOrientationTable(item):
+    item["orDimensions"] = getOrientationTable(item)
+    item["distinctOr"] = getDistinctOrientations(item)
+    return item
+
+
 def changeOrientationToBest(avgWeight, weightStdDev, item):
     """
     This function changes the item orientation to the one which maximizes the
@@ -71,7 +78,8 @@ def adaptPackets(items, alpha):
     weiStdDev = itemsDf["weight"].std(ddof=0)
     # From 'cm' to 'm'
     itemsDf[["width", "height", "length"]] = itemsDf[["width", "height", "length"]] / 100
-    items = list(map(lambda x: changeOrientationToBest(avgWeight, weiStdDev, x), itemsDf.to_dict(orient="records")))
+    items = list(map(lambda x: changeOrientationToBest(avgWeight, weiStdDev, setOrientationTable(x)),
+                     itemsDf.to_dict(orient="records")))
     if not areTaxed(items):
         return addTaxToDataset(items, alpha)
     else:
@@ -88,3 +96,60 @@ def cleanDestinationAndSource(items):
         del i["dst"]
         del i["src"]
     return items
+
+
+# -------------------- Grouping ----------------------------------------
+def getPacketGroupKey(item):
+    """
+    This function gets the attributes that make two items interchangeable in the packing phases.
+
+    :param item: item object.
+    :return: tuple with the dimensions, weight, destination, priority, ADR, fragility and orientations of the item.
+    """
+    return (item["width"], item["height"], item["length"], item["weight"], item["dstCode"], item["priority"],
+            item["ADR"], item["fragility"], item["or"], tuple(item["feasibleOr"]))
+
+
+def groupIdenticalPackets(items):
+    """
+    This function collapses the runs of consecutive identical items of a list into groups, keeping their order.
+
+    :param items: list of items.
+    :return: list of groups, dictionaries with the number of items of the group and the items themselves.
+    """
+    groups = []
+    for item in items:
+        if groups and getPacketGroupKey(groups[-1]["items"][0]) == getPacketGroupKey(item):
+            groups[-1]["items"].append(item)
+            groups[-1]["count"] += 1
+        else:
+            groups.append({"count": 1, "items": [item]})
+    return groups
+
+
+def getPacketTypeKey(item):
+    """
+    This function gets the attributes that make two items interchangeable in any of their orientations.
+
+    :param item: item object.
+    :return: tuple with the sorted dimensions, weight, destination, priority, ADR, fragility and orientations of the
+    item.
+    """
+    return (tuple(sorted([item["width"], item["height"], item["length"]])), item["weight"], item["dstCode"],
+            item["priority"], item["ADR"], item["fragility"], tuple(item["feasibleOr"]))
+
+
+def groupPacketsByType(items):
+    """
+    This function groups the items of the same type, whatever their orientation or position in the list.
+
+    :param items: list of items.
+    :return: list of groups in order of their first item, dictionaries with the number of items of the group and the
+    items themselves in their order.
+    """
+    groups = {}
+    for item in items:
+        group = groups.setdefault(getPacketTypeKey(item), {"count": 0, "items": []})
+        group["items"].append(item)
+        group["count"] += 1
+    return list(groups.values())
@@ -0,0 +1,86 @@
+"""
+This module contains the pool of candidate items of the packing phases.
+"""
+
+import heapq
+import itertools
+
+
+class CandidatePool:
+    """
+    Items indexed by id in their original order, grouped by destination, with lazy heaps that keep the maximum
+    weight, volume and priority of the items in the pool while they are removed. The ids must be unique.
+    """
+
+    def __init__(self, items, aggregates=("weight", "volume", "priority")):
+        """
+        :param items: list of items.
+        :param aggregates: attributes of the items whose maximum is kept.
+        """
+        self.sequence = itertools.count()
+        self.items = {}
+        self.byDst = {}
+        self.heaps = dict(map(lambda x: (x, []), aggregates))
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, itemId):
+        return itemId in self.items
+
+    def add(self, item):
+        """
+        This function adds an item at the end of the pool.
+
+        :param item: item object.
+        """
+        if item["id"] in self.items:
+            raise ValueError("Duplicate item id in the candidate pool: " + str(item["id"]))
+        self.items[item["id"]] = item
+        self.byDst.setdefault(item["dstCode"], {})[item["id"]] = item
+        for key, heap in self.heaps.items():
+            heapq.heappush(heap, (-item[key], next(self.sequence), item["id"]))
+
+    def remove(self, itemId):
+        """
+        This function removes an item from the pool.
+
+        :param itemId: id of the item.
+        :return: the removed item.
+        """
+        item = self.items.pop(itemId)
+        del self.byDst[item["dstCode"]][itemId]
+        return item
+
+    def getItems(self, dstCode=None):
+        """
+        This function gets the items of the pool in their original order.
+
+        :param dstCode: destination of the items, all of them if None.
+        :return: list of items.
+        """
+        return list((self.items if dstCode is None else self.byDst.get(dstCode, {})).values())
+
+    def count(self, dstCode=None):
+        """
+        This function gets the number of items of the pool.
+
+        :param dstCode: destination of the items, all of them if None.
+        :return: number of items.
+        """
+        return len(self.items if dstCode is None else self.byDst.get(dstCode, {}))
+
+    def getMax(self, key):
+        """
+        This function gets the maximum value of an attribute among the items of the pool.
+
+        :param key: name of the attribute.
+        :return: maximum value, None if the pool is empty.
+        """
+        heap = self.heaps[key]
+        # Entries of removed items, or left by an item added again, are dropped when they reach the top.
+        while heap and (heap[0][2] not in self.items or self.items[heap[0][2]][key] != -heap[0][0]):
+            heapq.heappop(heap)
+        return -heap[0][0] if heap else None
@@ -15,7 +15,12 @@ def getAverageWeight(items):
 
 def getStatsForBase(items):
     df = pd.DataFrame(items)
-    return df.groupby(["dstCode"])[["width", "height", "length"]].mean().mean(axis=1), df["weight"].mean(), df["weight"].std(ddof=0)
+    sizes = df
+    # The columns of consolidated items are left out of the mean sizes, unless a destination only has columns.
+    if "consolidated" in df:
+        isColumn = df["consolidated"].notna()
+        sizes = df[~isColumn | isColumn.groupby(df["dstCode"]).transform("all")]
+    return sizes.groupby(["dstCode"])[["width", "height", "length"]].mean().mean(axis=1), df["weight"].mean(), df["weight"].std(ddof=0)
 
 
 def getAverageVolume(items):
@@ -88,9 +93,21 @@ def getMaxWeight(items):
     return max(item["weight"] for item in items)
 
 
-def changeItemOrientation(item, validOrientations):
+def getWeightLimit(item):
     """
-    This function randomly chooses a feasible orientation with equal probability.
+    This function gets the maximum weight an item can hold on top of it, its weight or half of it if fragile. In a
+    column of consolidated items it is the one of the item at the top.
+
+    :param item: item object.
+    :return: weight in kilograms.
+    """
+    weight = item["topWeight"] if "topWeight" in item else item["weight"]
+    return 0.5 * weight if item["fragility"] else weight
+
+
+def getOrientationTable(item):
+    """
+    This function gets the dimensions of an item in each of the six orientations.
     # Orientation equivalences (x, y, z) ---> |o1 -> (w, h, l) |
             And taking o1 as reference        |o2 -> (l, h, w) |
                                               |o3 -> (w, l, h) |
@@ -99,41 +116,69 @@ def changeItemOrientation(item, validOrientations):
                                               |o6 -> (h, w, l) |
 
     :param item: item object.
-    :param validOrientations: allowed orientations.
-    :return: item object with a randomly different orientation
+    :return: list with the [width, height, length] in metres of orientations 1 to 6.
     """
-    orientation = random.choice(validOrientations)
     # First we need to normalize the measures to o1.
     dim = sorted([item["width"], item["height"], item["length"]])
     o1width, o1height, o1length = dim[2], dim[0], dim[1]
+    return [[o1width, o1height, o1length], [o1length, o1height, o1width], [o1width, o1length, o1height],
+            [o1height, o1length, o1width], [o1length, o1width, o1height], [o1height, o1width, o1length]]
+
+
+def getDimensionsInOrientation(item, orientation):
+    """
+    This function gets the dimensions an item would have in a given orientation without modifying it.
+
+    :param item: item object.
+    :param orientation: orientation code.
+    :return: tuple with width, height and length in metres.
+    """
+    table = item["orDimensions"] if "orDimensions" in item else getOrientationTable(item)
+    return tuple(table[orientation - 1 if 1 <= orientation <= 6 else 0])
+
+
+def getDistinctOrientations(item):
+    """
+    This function gets the feasible orientations of an item that are geometrically distinct, keeping the first of
+    those with the same dimensions.
+
+    :param item: item object.
+    :return: list of orientation codes.
+    """
+    if "distinctOr" in item:
+        return item["distinctOr"]
+    distinct, dimensions = [], set()
+    for o in item["feasibleOr"]:
+        if getDimensionsInOrientation(item, o) not in dimensions:
+            dimensions.add(getDimensionsInOrientation(item, o))
+            distinct.append(o)
+    return distinct
+
+
+def setItemOrientation(item, orientation):
+    """
+    This function sets the orientation of an item and its dimensions in it.
+
+    :param item: item object.
+    :param orientation: orientation code.
+    :return: item object in the orientation.
+    """
     item["or"] = orientation
-    if orientation == 2:
-        item["width"] = o1length
-        item["height"] = o1height
-        item["length"] = o1width
-    elif orientation == 3:
-        item["width"] = o1width
-        item["height"] = o1length
-        item["length"] = o1height
-    elif orientation == 4:
-        item["width"] = o1height
-        item["height"] = o1length
-        item["length"] = o1width
-    elif orientation == 5:
-        item["width"] = o1length
-        item["height"] = o1width
-        item["length"] = o1height
-    elif orientation == 6:
-        item["width"] = o1height
-        item["height"] = o1width
-        item["length"] = o1length
-    else:
-        item["width"] = o1width
-        item["height"] = o1height
-        item["length"] = o1length
+    item["width"], item["height"], item["length"] = getDimensionsInOrientation(item, orientation)
     return item
 
 
+def changeItemOrientation(item, validOrientations):
+    """
+    This function randomly chooses a feasible orientation with equal probability.
+
+    :param item: item object.
+    :param validOrientations: allowed orientations.
+    :return: item object with a randomly different orientation
+    """
+    return setItemOrientation(item, random.choice(validOrientations))
+
+
 def getWeightStandardDeviation(items):
     """
     This function gets the standard deviation of a set of items.
@@ -0,0 +1,111 @@
+"""
+This module contains the builder of the blocks of identical items placed in walls before the loading stages.
+"""
+
+import math
+import numpy as np
+from main.packetAdapter.helpers import getDimensionsInOrientation, getDistinctOrientations, getWeightLimit
+
+
+class BlockBuilder:
+    """
+    Walls of identical items laid one behind the other from a depth of the container. A wall is a grid of columns
+    across the width of the container, each of them a stack of items on identical ones up to its height, so every
+    item above the floor rests on the whole top of the one below. The layout of a type of item is the feasible
+    orientation whose wall covers the largest part of the cross section of the container.
+    """
+
+    def __init__(self, truck, gap=0.0015):
+        """
+        :param truck: truck object.
+        :param gap: distance kept between the items of the walls and between consecutive walls.
+        """
+        self.width = truck["width"]
+        self.height = truck["height"]
+        self.length = truck["length"]
+        self.gap = gap
+
+    def getCount(self, size, limit):
+        """
+        This function gets how many boxes of a size fit in a row with the gap between them.
+
+        :param size: size of the boxes.
+        :param limit: length of the row.
+        :return: number of boxes.
+        """
+        count = math.floor((limit + self.gap) / (size + self.gap))
+        # The rounding of the division may give one box more than the ones fitting.
+        while count and count * size + (count - 1) * self.gap > limit:
+            count -= 1
+        return count
+
+    def getLayout(self, item):
+        """
+        This function gets the wall of a type of item that covers the largest part of the cross section of the
+        container, with more items per wall on ties. The walls of the items that cannot hold an identical one, as the
+        fragile ones, have a single row.
+
+        :param item: item object.
+        :return: dictionary with the orientation, the width, height and length of the items in it and the number of
+        columns and rows of the wall, None if no item fits in the container.
+        """
+        best, bestKey = None, None
+        for o in getDistinctOrientations(item):
+            width, height, length = getDimensionsInOrientation(item, o)
+            columns = self.getCount(width, self.width)
+            rows = self.getCount(height, self.height)
+            if item["weight"] > getWeightLimit(item):
+                rows = min(rows, 1)
+            if not columns or not rows or length > self.length:
+                continue
+            key = (columns * width * rows * height, columns * rows)
+            if bestKey is None or key > bestKey:
+                best, bestKey = {"or": o, "dims": np.array([width, height, length]), "columns": columns,
+                                 "rows": rows}, key
+        return best
+
+    def getWallCorners(self, layout, z):
+        """
+        This function gets the Bottom-Left-Front corners of the items of a wall, row by row from the floor, so each
+        item is placed after the one it rests on.
+
+        :param layout: layout of the wall.
+        :param z: depth of the front of the wall.
+        :return: ndarray of cartesian points, one per row.
+        """
+        x = np.arange(layout["columns"]) * (layout["dims"][0] + self.gap)
+        y = np.arange(layout["rows"]) * (layout["dims"][1] + self.gap)
+        corners = np.zeros((layout["rows"] * layout["columns"], 3))
+        corners[:, 0] = np.tile(x, layout["rows"])
+        corners[:, 1] = np.repeat(y, layout["columns"])
+        corners[:, 2] = z
+        return corners
+
+    def getWallBox(self, layout, z):
+        """
+        This function gets the box enclosing the items of a wall.
+
+        :param layout: layout of the wall.
+        :param z: depth of the front of the wall.
+        :return: tuple with the Bottom-Left-Front corner and the width, height and length of the box.
+        """
+        counts = np.array([layout["columns"], layout["rows"], 1])
+        return np.array([0, 0, z], dtype=float), counts * layout["dims"] + (counts - 1) * self.gap
+
+    def getPointsAround(self, layout, startZ, minDim):
+        """
+        This function gets the potential points of the free space beside and over some consecutive walls of a layout,
+        at the front of the space.
+
+        :param layout: layout of the walls.
+        :param startZ: depth of the front of the first wall.
+        :param minDim: minimum size in any dimension (width, height, length) of any item to be placed.
+        :return: ndarray of cartesian points, one per row.
+        """
+        _, dims = self.getWallBox(layout, startZ)
+        points = []
+        if self.width - dims[0] - self.gap >= minDim:
+            points.append([dims[0] + self.gap, 0, startZ])
+        if self.height - dims[1] - self.gap >= minDim:
+            points.append([0, dims[1] + self.gap, startZ])
+        return np.array(points, dtype=float).reshape(-1, 3)
@@ -0,0 +1,100 @@
+"""
+This module contains the pipeline that evaluates the constraints of the insertions of the constructive phase.
+"""
+
+import time
+
+
+class ConstraintPipeline:
+    """
+    Named constraints evaluated in sequence until one of them rejects the insertion. The calls, rejections and time
+    spent of every constraint are recorded for each stage, and every given number of evaluations the constraints of a
+    stage are reordered so those with the lowest time per rejection go first. The constraints only depend on the
+    insertion and share what they compute through it, so the order does not change the result.
+    """
+
+    def __init__(self, constraints, period=256):
+        """
+        :param constraints: list of (name, function) in the initial order, the function receives the insertion and
+        returns True if the constraint is satisfied.
+        :param period: number of evaluations of a stage between two reorderings of its constraints.
+        """
+        self.constraints = dict(constraints)
+        self.names = list(map(lambda x: x[0], constraints))
+        self.period = period
+        # Stage -> names of the constraints in the order they are evaluated.
+        self.orders = {}
+        # Stage -> number of evaluations since the last reordering.
+        self.evaluations = {}
+        # Stage -> name -> [calls, rejections, seconds].
+        self.stats = {}
+
+    def record(self, stage, name, calls, rejections, elapsed):
+        """
+        This function adds the outcome of some checks of a constraint to the statistics of a stage.
+
+        :param stage: packing stage of the algorithm.
+        :param name: name of the constraint.
+        :param calls: number of insertions checked.
+        :param rejections: number of insertions rejected.
+        :param elapsed: time spent in seconds.
+        """
+        stats = self.stats.setdefault(stage, {}).setdefault(name, [0, 0, 0.0])
+        stats[0] += calls
+        stats[1] += int(rejections)
+        stats[2] += elapsed
+
+    def evaluate(self, insertion, stage, names=None):
+        """
+        This function checks the constraints of an insertion.
+
+        :param insertion: object passed to the constraints.
+        :param stage: packing stage of the algorithm.
+        :param names: names of the constraints to be checked, all of them if None. It must be the same in each stage.
+        :return: True if every constraint is satisfied, False otherwise.
+        """
+        order = self.orders.setdefault(stage, list(names if names is not None else self.names))
+        self.evaluations[stage] = self.evaluations.get(stage, 0) + 1
+        if self.evaluations[stage] >= self.period:
+            self.reorder(stage)
+        for name in order:
+            start = time.perf_counter()
+            satisfied = self.constraints[name](insertion)
+            self.record(stage, name, 1, not satisfied, time.perf_counter() - start)
+            if not satisfied:
+                return False
+        return True
+
+    def reorder(self, stage):
+        """
+        This function sorts the constraints of a stage by their time per rejection, keeping the current order on ties.
+
+        :param stage: packing stage of the algorithm.
+        """
+        stats = self.stats.get(stage, {})
+
+        def getTimePerRejection(name):
+            calls, rejections, elapsed = stats.get(name, [0, 0, 0.0])
+            # Constraints not checked yet go first so their statistics are gathered.
+            if not calls:
+                return 0.0
+            return elapsed / rejections if rejections else float("inf")
+
+        self.orders[stage].sort(key=getTimePerRejection)
+        self.evaluations[stage] = 0
+
+    def getStats(self):
+        """
+        This function gets the statistics of the constraints.
+
+        :return: dictionary with a list per stage, in the current order of evaluation, of dictionaries with the name,
+        calls, rejections, rejection rate and time spent in seconds of each constraint.
+        """
+        result = {}
+        for stage, stats in self.stats.items():
+            order = self.orders.get(stage, [])
+            names = order + sorted(set(stats) - set(order))
+            result[stage] = list(map(lambda x: {"name": x, "calls": stats[x][0], "rejections": stats[x][1],
+                                                "rejectionRate": stats[x][1] / stats[x][0] if stats[x][0] else 0,
+                                                "time": stats[x][2]}, filter(lambda x: x in stats, names)))
+        return result
@@ -0,0 +1,120 @@
+"""
+This module contains the cache of the feasibility checks that only depend on the cargo underneath the probed items.
+"""
+
+import math
+
+
+class FeasibilityCache:
+    """
+    Results of the checks of the items probed in the container that only depend on the cargo underneath them, stored
+    by the center of the bottom plane of the item and by its dimensions. The places are also bucketed in a uniform
+    grid, so when an item is placed only the entries of the cells around it are visited, and only those of the places
+    it may be under are dropped.
+    """
+
+    def __init__(self, resolution=0.000001, cellSize=0.25):
+        """
+        :param resolution: size in metres of the grid used to quantize the places.
+        :param cellSize: edge in metres of the cubic cells in which the places are bucketed.
+        """
+        self.resolution = resolution
+        self.cellSize = cellSize
+        # Largest distance in the x and z axes from the center of a stored place to the border of its item.
+        self.reach = 0
+        # Quantized place -> (place, {item key: entry}).
+        self.entries = {}
+        # Cell -> set of quantized places in it.
+        self.cells = {}
+        # Lowest cell in height with any place.
+        self.lowestLayer = 0
+
+    def getKey(self, point):
+        """
+        This function gets the hash key of a place.
+
+        :param point: cartesian point.
+        :return: tuple with the quantized coordinates.
+        """
+        return tuple(int(round(c / self.resolution)) for c in point)
+
+    def getCell(self, point):
+        """
+        This function gets the cell of a place.
+
+        :param point: cartesian point.
+        :return: tuple with the cell indexes.
+        """
+        return tuple(math.floor(c / self.cellSize) for c in point)
+
+    def get(self, point, itemKey):
+        """
+        This function gets the entry of an item in a place.
+
+        :param point: cartesian point in the center of the bottom plane of the item.
+        :param itemKey: hashable description of the item.
+        :return: the entry, None if there is none.
+        """
+        entries = self.entries.get(self.getKey(point))
+        return entries[1].get(itemKey) if entries is not None else None
+
+    def put(self, point, itemKey, entry, reach):
+        """
+        This function stores the entry of an item in a place.
+
+        :param point: cartesian point in the center of the bottom plane of the item.
+        :param itemKey: hashable description of the item.
+        :param entry: result of the checks.
+        :param reach: largest distance in the x and z axes from the point to the border of the item.
+        """
+        self.reach = max(self.reach, reach)
+        key = self.getKey(point)
+        if key not in self.entries:
+            self.entries[key] = (point, {})
+            cell = self.getCell(point)
+            self.cells.setdefault(cell, set()).add(key)
+            self.lowestLayer = min(self.lowestLayer, cell[1])
+        self.entries[key][1][itemKey] = entry
+
+    def invalidate(self, blf, trr, tolerance, margin=0, below=False):
+        """
+        This function drops the entries of the places whose items could be supported by a box, that is, those at the
+        height of its top plane and close enough in the x and z axes.
+
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+        :param trr: cartesian coordinates of the Top-Right-Rear corner of the box.
+        :param tolerance: maximum distance between a top plane and a bottom plane to be in contact.
+        :param margin: extra distance in the x and z axes to be considered around the box.
+        :param below: True to also drop the places below the top plane of the box.
+        """
+        reach = self.reach + margin
+        low = self.getCell([blf[0] - reach, trr[1] - tolerance, blf[2] - reach])
+        high = self.getCell([trr[0] + reach, trr[1] + tolerance, trr[2] + reach])
+        for i in range(low[0], high[0] + 1):
+            for j in range(self.lowestLayer if below else low[1], high[1] + 1):
+                for k in range(low[2], high[2] + 1):
+                    keys = self.cells.get((i, j, k))
+                    if keys is None:
+                        continue
+                    for key in [key for key in keys if self.isAffected(self.entries[key][0], blf, trr, tolerance,
+                                                                        reach, below)]:
+                        keys.remove(key)
+                        del self.entries[key]
+                    if not keys:
+                        del self.cells[(i, j, k)]
+
+    @staticmethod
+    def isAffected(point, blf, trr, tolerance, reach, below):
+        """
+        This function checks whether the item of a place could be supported by a box.
+
+        :param point: cartesian point of the place.
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+        :param trr: cartesian coordinates of the Top-Right-Rear corner of the box.
+        :param tolerance: maximum distance between a top plane and a bottom plane to be in contact.
+        :param reach: distance in the x and z axes to be considered around the box.
+        :param below: True to also consider the places below the top plane of the box.
+        :return: True if the entries of the place have to be dropped, False otherwise.
+        """
+        return (below or trr[1] - tolerance <= point[1]) and point[1] <= trr[1] + tolerance \
+            and blf[0] - reach <= point[0] <= trr[0] + reach and blf[2] - reach <= point[2] <= trr[2] + reach
@@ -5,6 +5,7 @@ university: Universidad Politécnica de Madrid
 
 import numpy as np
 from main.packetAdapter.helpers import changeItemOrientation
+from main.packetOptimization.constructivePhase.placedItem import PlacedItem
 
 
 # --------------------------------- Item geometric helpers -----------------------------------
@@ -32,6 +33,8 @@ def isInFloor(item):
     :param item: object representing the item.
     :return: True if the item is in the floor, False otherwise.
     """
+    if isinstance(item, PlacedItem):
+        return bool(item.getGeometry().bottom == 0)
     if item["mass_center"][1] - item["height"] / 2 == 0:
         return True
     return False
@@ -44,6 +47,8 @@ def getBLF(item):
     :param item: object representing the item.
     :return: The cartesian coordinates of the corner.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().blf
     return item["mass_center"] - [item["width"] / 2, item["height"] / 2, item["length"] / 2]
 
 
@@ -54,6 +59,8 @@ def getBRF(item):
     :param item: object representing the item.
     :return: The cartesian coordinates of the corner.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().brf
     return item["mass_center"] - [-item["width"] / 2, item["height"] / 2, item["length"] / 2]
 
 
@@ -64,6 +71,8 @@ def getBRR(item):
     :param item: object representing the item.
     :return: The cartesian coordinates of the corner.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().brr
     return item["mass_center"] + [item["width"] / 2, -item["height"] / 2, item["length"] / 2]
 
 
@@ -74,6 +83,8 @@ def getBLR(item):
     :param item: object representing the item.
     :return: The cartesian coordinates of the corner.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().blr
     return item["mass_center"] + [-item["width"] / 2, -item["height"] / 2, item["length"] / 2]
 
 
@@ -84,6 +95,8 @@ def getTLF(item):
     :param item: object representing the item.
     :return: The cartesian coordinates of the corner.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().tlf
     return item["mass_center"] - [item["width"] / 2, -item["height"] / 2, item["length"] / 2]
 
 
@@ -94,6 +107,8 @@ def getTRF(item):
     :param item: object representing the item.
     :return: The cartesian coordinates of the corner.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().trf
     return item["mass_center"] + [item["width"] / 2, item["height"] / 2, -item["length"] / 2]
 
 
@@ -104,6 +119,8 @@ def getTRR(item):
     :param item: object representing the item.
     :return: The cartesian coordinates of the corner.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().trr
     return item["mass_center"] + [item["width"] / 2, item["height"] / 2, item["length"] / 2]
 
 
@@ -114,6 +131,8 @@ def getTLR(item):
     :param item: object representing the item.
     :return: The cartesian coordinates of the corner.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().tlr
     return item["mass_center"] + [-item["width"] / 2, item["height"] / 2, item["length"] / 2]
 
 
@@ -124,6 +143,8 @@ def getBottomPlaneHeight(item):
     :param item: object representing the item.
     :return: Height in metres.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().bottom
     return item["mass_center"][1] - item["height"] / 2
 
 
@@ -134,9 +155,26 @@ def getTopPlaneHeight(item):
     :param item: object representing the item.
     :return: Height in metres.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().top
     return item["mass_center"][1] + item["height"] / 2
 
 
+def getSharePlaneItems(item, placedItems, tolerance, planeIndex=None):
+    """
+    This function gets the placed items whose top plane is at the height of the bottom plane of an item.
+
+    :param item: object representing the item.
+    :param placedItems: list of placed items.
+    :param tolerance: maximum distance in metres between both planes.
+    :param planeIndex: index of the placed items by top plane height, if given it is used instead of the list.
+    :return: list of items in insertion order.
+    """
+    if planeIndex is not None:
+        return planeIndex.query(getBottomPlaneHeight(item), tolerance)
+    return list(filter(lambda x: 0 <= abs(getBottomPlaneHeight(item) - getTopPlaneHeight(x)) <= tolerance, placedItems))
+
+
 def getBottomPlaneArea(item):
     """
     This function gets the bottom plane's item area.
@@ -144,6 +182,8 @@ def getBottomPlaneArea(item):
     :param item: object representing the item.
     :return: area in square metres.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().area
     return item["length"] * item["width"]
 
 
@@ -172,6 +212,8 @@ def getPlanesFor(item):
     :param item: item object.
     :return: tuple of 3 planes.
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().planes
     blf = getBLF(item)
     return np.array([blf[0], blf[1], item["width"], item["height"]]), \
            np.array([blf[2], blf[1], item["length"], item["height"]]), \
@@ -185,6 +227,8 @@ def getZXPlaneFor(item):
     :param item: item object.
     :return: ndarray representing [z,x,dZ,dX]
     """
+    if isinstance(item, PlacedItem):
+        return item.getGeometry().planes[2]
     blf = getBLF(item)
     return np.array([blf[2], blf[0], item["length"], item["width"]])
 
@@ -202,18 +246,42 @@ def pointInPlane(point, planeLF, planeRR):
         2] - 0.0001
 
 
+def getPointsInPlaneMask(points, planeLF, planeRR):
+    """
+    This function checks which points of a set are inside a plane.
+
+    :param points: ndarray of cartesian points, one per row.
+    :param planeLF: cartesian left front point of the plane.
+    :param planeRR: cartesian right rear point of the plane.
+    :return: boolean ndarray, True for the points into the plane.
+    """
+    return (planeRR[0] + 0.0001 >= points[:, 0]) & (points[:, 0] >= planeLF[0] - 0.0001) & \
+           (planeRR[2] + 0.0001 >= points[:, 2]) & (points[:, 2] >= planeLF[2] - 0.0001)
+
+
 def getEuclideanDistanceTo(objective, fromReference):
     return np.sqrt(np.sum(np.square(objective - fromReference), axis=1))
 
 
-def getNearestProjectionPointFor(point, placedItems):
+def getNearestProjectionPointFor(point, placedItems, heightMap=None, grid=None):
     """
     This function projects a potential point onto the nearest item top plane along the y-axis.
 
     :param point: the cartesian point to be projected.
     :param placedItems: dictionary of placed packets.
+    :param heightMap: height map of the cargo, when given the projection is taken from it if possible.
+    :param grid: spatial grid of the container, when given only the items in the cells under the point are checked.
     :return: cartesian coordinates of the projected points.
     """
+    if heightMap is not None:
+        top = heightMap.getTopUnder(point)
+        # The map only keeps the highest surface, so it is not valid when that surface is above the point.
+        if top <= point[1]:
+            return np.array([point[0], top + 0.0015, point[2]]) if top else np.array([point[0], 0, point[2]])
+    if grid is not None:
+        # The cells of the column under the point, widened beyond the tolerance of pointInPlane.
+        placedItems = [placedItems[i] for i in grid.query(np.array([point[0] - 0.001, 0, point[2] - 0.001]),
+                                                          np.array([point[0] + 0.001, point[1], point[2] + 0.001]))]
     # Reduce the scope to those items whose top or bottom plane contains the point in (x,z)-axis and are underneath.
     pointIntoPlaneItems = list(filter(lambda x: pointInPlane(point, getBLF(x), getBRR(x)) and getTopPlaneHeight(x) <= point[1], placedItems))
     # Sort and get the item with the nearest y-axis value.
@@ -269,29 +337,18 @@ def projectPPOverlapped(item, potentialPoints):
     This function projects potential point to the closest free surface above them.
 
     :param item: item object.
-    :param potentialPoints: list of spatial coordinates.
-    :return: list of potential points projected.
-    """
-    PPsOverlapped = []
-    # Check same destination potential points overlapped.
-    currentDstPPsOverlapped = np.asarray(list(
-        filter(lambda x: pointInPlane(x, getBLF(item), getBRR(item)), potentialPoints[item["dstCode"]])))
-    PPsOverlapped.append(currentDstPPsOverlapped)
-    # Check the overlapping in previous destinations.
-    if item["dstCode"]:
-        # TODO comprobar si se tarda mas ordenando.
-        previousDstPPsOverlapped = np.asarray(list(
-            filter(lambda x: pointInPlane(x, getBLF(item), getBRR(item)), potentialPoints[item["dstCode"] - 1])))
-        PPsOverlapped.append(previousDstPPsOverlapped)
-    for j in range(len(PPsOverlapped)):
-        # j=0 -> currentDstPPsOverlapped, j=1 -> previousDstPPsOverlapped
-        index = item["dstCode"] if not j else item["dstCode"] - 1
-        if len(PPsOverlapped[j]):
-            nonOverlappedPPs = potentialPoints[index][
-                list(map(lambda x: not any((x == PPsOverlapped[j]).all(axis=1)), potentialPoints[index]))]
-            for p in PPsOverlapped[j]:
-                p[1] = getTopPlaneHeight(item) + 0.0015
-                potentialPoints[index] = np.vstack((nonOverlappedPPs, p))
+    :param potentialPoints: list of potential point stores by destination.
+    :return: list of potential point stores with the points projected.
+    """
+    # Check the overlapping in the same destination and in the previous one.
+    for index in [item["dstCode"], item["dstCode"] - 1][:1 + bool(item["dstCode"])]:
+        points = potentialPoints[index].getPoints()
+        PPsOverlapped = points[getPointsInPlaneMask(points, getBLF(item), getBRR(item))]
+        if len(PPsOverlapped):
+            potentialPoints[index].remove(PPsOverlapped)
+            # The overlapped points are lifted to the top of the item, the store drops the repeated ones.
+            PPsOverlapped[:, 1] = getTopPlaneHeight(item) + 0.0015
+            potentialPoints[index].add(PPsOverlapped)
     return potentialPoints
 
 
@@ -0,0 +1,86 @@
+"""
+This module contains the 2.5D height map of the top surfaces of the cargo over the floor of the container.
+"""
+
+import math
+import numpy as np
+
+
+class HeightMap:
+    """
+    Raster over the (x, z) plane of the container where each cell keeps the highest top plane of the placed items
+    covering its center. It only keeps one height per cell, so the surfaces hidden under an overhang are lost.
+    """
+
+    def __init__(self, width, length, resolution):
+        """
+        :param width: width of the container.
+        :param length: length of the container.
+        :param resolution: edge of the square cells in metres.
+        """
+        self.resolution = resolution
+        self.tops = np.zeros((max(1, math.ceil(width / resolution)), max(1, math.ceil(length / resolution))))
+
+    def getCoveredCells(self, lf, rr):
+        """
+        This function gets the cells whose centers are covered by a footprint.
+
+        :param lf: cartesian coordinates of the left front corner of the footprint.
+        :param rr: cartesian coordinates of the right rear corner of the footprint.
+        :return: tuple of slices over the x and z axes.
+        """
+        x0 = max(math.ceil(lf[0] / self.resolution - 0.5), 0)
+        x1 = min(math.floor(rr[0] / self.resolution - 0.5), self.tops.shape[0] - 1)
+        z0 = max(math.ceil(lf[2] / self.resolution - 0.5), 0)
+        z1 = min(math.floor(rr[2] / self.resolution - 0.5), self.tops.shape[1] - 1)
+        return slice(x0, max(x1 + 1, x0)), slice(z0, max(z1 + 1, z0))
+
+    def getCellsOverlap(self, start, end, axis):
+        """
+        This function gets the length of the overlap between a segment and each cell it crosses in an axis.
+
+        :param start: start of the segment.
+        :param end: end of the segment.
+        :param axis: 0 for x-axis, 1 for z-axis.
+        :return: first cell crossed and ndarray with the overlaps.
+        """
+        first = min(max(int(start // self.resolution), 0), self.tops.shape[axis] - 1)
+        last = min(max(int(end // self.resolution), 0), self.tops.shape[axis] - 1)
+        edges = np.arange(first, last + 2) * self.resolution
+        return first, np.clip(np.minimum(edges[1:], end) - np.maximum(edges[:-1], start), 0, None)
+
+    def insert(self, blf, trr):
+        """
+        This function raises the cells under the footprint of a placed item to its top plane.
+
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the item.
+        :param trr: cartesian coordinates of the Top-Right-Rear corner of the item.
+        """
+        cells = self.getCoveredCells(blf, trr)
+        self.tops[cells] = np.maximum(self.tops[cells], trr[1])
+
+    def getSupport(self, lf, rr, height, tolerance):
+        """
+        This function gets the support under a footprint at a given height.
+
+        :param lf: cartesian coordinates of the left front corner of the footprint.
+        :param rr: cartesian coordinates of the right rear corner of the footprint.
+        :param height: height of the bottom plane to be supported.
+        :param tolerance: maximum distance between the bottom plane and a top plane to be in contact.
+        :return: tuple with the highest top plane under the footprint and the supported area in square metres.
+        """
+        x0, overlapX = self.getCellsOverlap(lf[0], rr[0], 0)
+        z0, overlapZ = self.getCellsOverlap(lf[2], rr[2], 1)
+        tops = self.tops[x0:x0 + len(overlapX), z0:z0 + len(overlapZ)]
+        supported = np.abs(tops - height) <= tolerance
+        return tops.max(), float(np.sum(np.outer(overlapX, overlapZ)[supported]))
+
+    def getTopUnder(self, point):
+        """
+        This function gets the highest top plane under a point in the (x, z) plane.
+
+        :param point: cartesian point.
+        :return: height in metres, 0 if there is no item under it.
+        """
+        return self.tops[min(max(int(point[0] // self.resolution), 0), self.tops.shape[0] - 1),
+                         min(max(int(point[2] // self.resolution), 0), self.tops.shape[1] - 1)]
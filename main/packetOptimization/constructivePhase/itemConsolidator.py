@@ -0,0 +1,179 @@
+"""
+This module contains the consolidation of the small items of the cargo into columns, handled as single items by the
+constructive phase and expanded back into their items in the solution.
+"""
+
+import numpy as np
+from main.packetAdapter.adapter import getPacketTypeKey
+from main.packetAdapter.helpers import getOrientationTable, getDistinctOrientations, getDimensionsInOrientation, \
+    setItemOrientation
+from main.packetOptimization.constructivePhase.placedItem import PlacedItem
+
+
+def getOrientationWith(item, dimensions):
+    """
+    This function gets a feasible orientation of an item with some dimensions.
+
+    :param item: item object.
+    :param dimensions: tuple with the width, height and length in metres.
+    :return: orientation code, None if the item has no feasible orientation with those dimensions.
+    """
+    if (item["width"], item["height"], item["length"]) == dimensions:
+        return item["or"]
+    return next(filter(lambda x: getDimensionsInOrientation(item, x) == dimensions, item["feasibleOr"]), None)
+
+
+class ColumnConsolidator:
+    """
+    Columns of small items of the same destination and priority with the same base, stacked from the heaviest one with
+    a gap between them, so every item rests on the whole top of the one below and does not weigh more than it. A column
+    is an item with the dimensions of its box, the weight, volume and taxability of its items and the weight limit of
+    its top item, which can only be turned around the vertical axis. The fragile and ADR items are not consolidated,
+    the first cannot hold other items and the second go to the rear of the container.
+    """
+
+    def __init__(self, maxSize, maxHeight, gap=0.0015):
+        """
+        :param maxSize: largest dimension in metres of the items consolidated.
+        :param maxHeight: maximum height in metres of a column.
+        :param gap: distance kept between the items of a column.
+        """
+        self.maxSize = maxSize
+        self.maxHeight = maxHeight
+        self.gap = gap
+
+    def isConsolidable(self, item):
+        """
+        This function checks whether an item can be part of a column.
+
+        :param item: item object.
+        :return: True if it can, False otherwise.
+        """
+        return not item["fragility"] and not item["ADR"] \
+               and max(item["width"], item["height"], item["length"]) <= self.maxSize
+
+    def getStacks(self, items):
+        """
+        This function splits some items with the same base into stacks no higher than the maximum height, filling
+        them in order of weight from the heaviest one.
+
+        :param items: list of items.
+        :return: list of stacks, each a list of items from the bottom.
+        """
+        stacks, height = [], 0
+        for item in sorted(items, key=lambda x: x["weight"], reverse=True):
+            if stacks and height + self.gap + item["height"] <= self.maxHeight:
+                stacks[-1].append(item)
+                height += self.gap + item["height"]
+            else:
+                stacks.append([item])
+                height = item["height"]
+        return stacks
+
+    def createColumn(self, items, columnId):
+        """
+        This function creates the item of a column.
+
+        :param items: list of the items of the column from the bottom, with the same base.
+        :param columnId: id of the column.
+        :return: item object of the column, with its items under the key "consolidated".
+        """
+        width, length = items[0]["width"], items[0]["length"]
+        height = sum(map(lambda x: x["height"], items)) + (len(items) - 1) * self.gap
+        column = dict(items[0])
+        column.pop("distinctOr", None)
+        column.update({"id": columnId, "width": width, "height": height, "length": length,
+                       "weight": sum(map(lambda x: x["weight"], items)),
+                       "volume": sum(map(lambda x: x["volume"], items)), "topWeight": items[-1]["weight"],
+                       "consolidated": items})
+        if "taxability" in column:
+            column["taxability"] = sum(map(lambda x: x["taxability"], items))
+        column["orDimensions"] = getOrientationTable(column)
+        orientations = dict(map(lambda x: (getDimensionsInOrientation(column, x), x), range(6, 0, -1)))
+        column["or"] = orientations[(width, height, length)]
+        column["feasibleOr"] = [column["or"]]
+        # It can be turned around the vertical axis if each of its items can.
+        if width != length and all(map(lambda x: getOrientationWith(x, (length, x["height"], width)), items)):
+            column["feasibleOr"].append(orientations[(length, height, width)])
+        column["distinctOr"] = getDistinctOrientations(column)
+        return column
+
+    def consolidate(self, items):
+        """
+        This function stacks the small items in columns.
+
+        :param items: list of items.
+        :return: list with the columns, each of them in the place of its first item in the list, and the items that
+        are not in a column.
+        """
+        # The copies of an item are turned as the first of them, so they share its base.
+        groups, orientations = {}, {}
+        for item in filter(self.isConsolidable, items):
+            orientation = orientations.setdefault(getPacketTypeKey(item), item["or"])
+            if item["or"] != orientation:
+                setItemOrientation(item, orientation)
+            groups.setdefault((item["dstCode"], item["priority"], item["width"], item["length"]), []).append(item)
+        positions = dict(map(lambda x: (x[1]["id"], x[0]), enumerate(items)))
+        nextId = max(map(lambda x: x["id"], items), default=-1) + 1
+        # Position of the first item of each column -> column, and ids of the items in columns.
+        columns, consolidatedIds = {}, set()
+        for group in groups.values():
+            for stack in filter(lambda x: len(x) > 1, self.getStacks(group)):
+                columns[min(map(lambda x: positions[x["id"]], stack))] = self.createColumn(stack, nextId)
+                consolidatedIds.update(map(lambda x: x["id"], stack))
+                nextId += 1
+        return [columns[p] if p in columns else item for p, item in enumerate(items)
+                if p in columns or item["id"] not in consolidatedIds]
+
+    def setItemsIn(self, column):
+        """
+        This function sets the orientation of the items of a column as the column is and, if it has been placed,
+        their mass centers.
+
+        :param column: item object of the column.
+        :return: list of the items of the column from the bottom.
+        """
+        items = column["consolidated"]
+        bottom = column["mass_center"][1] - column["height"] / 2 if "mass_center" in column else None
+        for item in items:
+            setItemOrientation(item, getOrientationWith(item, (column["width"], item["height"], column["length"])))
+            if bottom is not None:
+                item["mass_center"] = np.array([column["mass_center"][0], bottom + item["height"] / 2,
+                                                column["mass_center"][2]])
+                bottom += item["height"] + self.gap
+        return items
+
+    def expandPlaced(self, placedItems):
+        """
+        This function replaces the placed columns by their items, in insertion order. The items of a column share its
+        contact area in each subzone and its weight contribution, in proportion to their weight.
+
+        :param placedItems: list of placed items.
+        :return: list of placed items.
+        """
+        expanded = []
+        for placedItem in placedItems:
+            if "consolidated" not in placedItem:
+                placedItem["in_id"] = len(expanded)
+                expanded.append(placedItem)
+                continue
+            items = self.setItemsIn(placedItem)
+            for k, item in enumerate(items):
+                item = PlacedItem(item)
+                item["subzones"] = list(map(lambda x: [x[0], x[1], x[2], x[3] * item["weight"] / placedItem["weight"]],
+                                            placedItem["subzones"]))
+                item["pp_in"] = placedItem["pp_in"] if not k else \
+                    item["mass_center"] - np.array([item["width"], item["height"], item["length"]]) / 2
+                item["pp_out"] = placedItem["pp_out"] if k == len(items) - 1 else np.empty((0, 3))
+                item["in_id"] = len(expanded)
+                expanded.append(item)
+        return expanded
+
+    def expandDiscarded(self, items):
+        """
+        This function replaces the discarded columns by their items.
+
+        :param items: list of discarded items.
+        :return: list of discarded items.
+        """
+        return sum(map(lambda x: self.setItemsIn(x) if "consolidated" in x else [x], items), [])
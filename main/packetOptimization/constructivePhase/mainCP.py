@@ -1,50 +1,34 @@
 import logging
+import math
 import random
 import sys
+import time
 
 from main.packetOptimization.constructivePhase.geometryHelpers import *
-from main.packetAdapter.helpers import getStatsForBase, getMinDim, getMaxWeight
+from main.packetAdapter.candidatePool import CandidatePool
+from main.packetAdapter.adapter import groupIdenticalPackets, groupPacketsByType
+from main.packetAdapter.helpers import getStatsForBase, getMinDim, getDimensionsInOrientation, \
+    getDistinctOrientations, setItemOrientation, getWeightLimit, getMaxWeight
 from main.packetOptimization.randomizationAndSorting.sorting import reSortingPhase
-from copy import deepcopy
+from main.packetOptimization.constructivePhase.placementRecord import PlacementRecord
+from main.packetOptimization.constructivePhase.placedItem import PlacedItem
+from main.packetOptimization.constructivePhase.constraintPipeline import ConstraintPipeline
+from main.packetOptimization.constructivePhase.potentialPointStore import PotentialPointStore
+from main.packetOptimization.constructivePhase.newPPBuffer import NewPPBuffer
+from main.packetOptimization.constructivePhase.placementEngine import CornerPointEngine, MaximalSpaceEngine
+from main.packetOptimization.constructivePhase.blockBuilder import BlockBuilder
+from main.packetOptimization.constructivePhase.itemConsolidator import ColumnConsolidator
+from main.packetOptimization.constructivePhase.searchBudget import SearchBudget
+from main.truckAdapter.adapter import setContainerIndexes, setContainerHeightMap, setContainerSubzoneLedger, \
+    cleanContainerIndexes
 import numpy as np
-import math
 from sklearn.metrics import mean_absolute_percentage_error
 
 
 np.set_printoptions(suppress=True)
 
 
-# --------------------- Weight Limit - C1 -------------------------------------------------------------
-def isWeightExceeded(newItem, truck):
-    """
-    This function checks is the weight allowed by the container has been exceeded.
-
-    :param newItem: new item to be placed.
-    :param truck: truck or container with weight limit.
-    :return: True is the weight has been exceeded, False otherwise.
-    """
-    return truck["weight"] + newItem["weight"] > truck["tonnage"]
-
-
 # ----------------- Weight Distribution and load balancing - C2 --------------------------------------
-def getSubzoneLength(subzones):
-    """
-    Get subzone length supposing they are all equal.
-
-    """
-    return subzones[0]["brr"][2]
-
-
-def getContainerSubzones(truck):
-    """
-    Getter for the truck subzones.
-
-    :param truck: truck or container which has subzones.
-    :return: subzones object.
-    """
-    return truck["subzones"]
-
-
 def getItemSubzones(item):
     """
     Getter for the subzones an item is in.
@@ -55,71 +39,18 @@ def getItemSubzones(item):
     return list(map(lambda x: x[0], item["subzones"]))
 
 
-def getPercentageOutSubzone(itemBRRz, subzoneBRRz, itemLength):
-    """
-    Gets the percentage of the base area of the item that is out of the subzone in which it was inserted.
-
-    :param itemBRRz: z-coordinate of the item BRR corner.
-    :param subzoneBRRz: z-coordinate of the subzone BRR corner.
-    :param itemLength: item length.
-    :return: percentage of the area out of the subzone.
-    """
-    return (itemBRRz - subzoneBRRz) / itemLength
-
-
-def getNeededExtraSubzonesForItem(subzonesLength, itemLength, outSubzone):
-    """
-    Gets the number of subzones needed to fit the part of the item out of its BLF insertion subzone.
-
-    :param subzonesLength: length of the subzones of the truck.
-    :param itemLength: length of the item.
-    :param outSubzone: percentage of the base area of the item that is out of the subzone in which it was inserted.
-    :return: number of needed extra subzones.
-    """
-    # Percentage * length(m) / subzoneLength(m)
-    return (outSubzone * itemLength) / subzonesLength
-
-
 def setItemSubzones(subzones, item):
     """
     This function sets in which zones is the item, for those, it returns an array with the id and the percentage of the base in.
     - Example 1: item in one zone then [id_zone, percentageIn(1)]
     - Example 2: item in two zones then [[id_zone1, p], [id_zone2, (1-p)] ]
 
-    :param subzones: the subzones of the truck.
+    :param subzones: the subzone ledger of the truck.
     :param item: item object.
     :return: item object with subzones added.
     """
-    item_blf_z = getBLF(item)[2]
-    item_brr_z = getBRR(item)[2]
-    subzonesLength = getSubzoneLength(subzones)
-    itemSubzones = []
-    for i in range(len(subzones)):
-        # Check if it fits completely in one subzone.
-        if subzones[i]["blf"][2] <= item_blf_z and subzones[i]["brr"][2] >= item_brr_z:
-            itemSubzones.append([i + 1, 1])
-            break
-        # Get if the blf of an item is within the subzone, and include needed extra subzones.
-        elif subzones[i]["blf"][2] <= item_blf_z < subzones[i]["brr"][2]:
-            # Percentage of item base out of subzone in which was inserted.
-            outSubzone = getPercentageOutSubzone(item_brr_z, subzones[i]["brr"][2], item["length"])
-            # Decimal number with the needed extra subzones.
-            neededExtraSubzonesForItem = getNeededExtraSubzonesForItem(subzonesLength, item["length"], outSubzone)
-            # First subzone the item is in.
-            itemSubzones = [[subzones[i]["id"], 1 - outSubzone]]
-            for s in range(1, math.ceil(neededExtraSubzonesForItem) + 1):
-                # Needed to calculate the percentage in the last subzone the item is in.
-                if s == math.ceil(neededExtraSubzonesForItem):
-                    # PercentageIn = subzoneLength*(decimalExtraSubzones - floorRoundedSubzones)/itemLength
-                    itemSubzones.append([subzones[i]["id"] + s, (subzonesLength * (
-                            neededExtraSubzonesForItem - math.floor(neededExtraSubzonesForItem))) / item[
-                                             "length"]])
-                # In case the item is in more than 2 subzones.
-                else:
-                    itemSubzones.append([subzones[i]["id"] + s, subzonesLength / item["length"]])
-        else:
-            continue
-    item["subzones"] = itemSubzones
+    ids, percentages = subzones.getSplit(getBLF(item)[2], getBRR(item)[2])
+    item["subzones"] = list(map(lambda x: [int(x[0]), float(x[1])], zip(ids, percentages)))
     return item
 
 
@@ -147,11 +78,9 @@ def addItemWeightToTruckSubzones(itemSubzones, truck):
     :param truck: truck object.
     :return: modified truck.
     """
-    for j in truck["subzones"]:
-        for i in itemSubzones:
-            if i[0] == j["id"]:
-                j["weight"] = j["weight"] + i[3]
-    truck["weight"] = sum(list(map(lambda x: x["weight"], truck["subzones"])))
+    contributions = np.array(list(map(lambda x: x[3], itemSubzones)), dtype=float)
+    truck["subzoneLedger"].addContributions(list(map(lambda x: x[0], itemSubzones)), contributions)
+    truck["weight"] = truck["weight"] + contributions.sum()
     return truck
 
 
@@ -160,326 +89,544 @@ def itemContributionNotExceedingSubzonesWeightLimit(item, truckSubzones):
     Checks if the weight contribution of a item in the subzones is on, exceeds their weight limits.
 
     :param item: item object.
-    :param truckSubzones: truck subzones object.
+    :param truckSubzones: subzone ledger of the truck.
     :return: ndarray with format [condition, item], where the condition is True if the contribution
     does not exceed the weight limits and False otherwise. The item is returned because it is modified
     with its contribution of weight broken down for each subzone.
     """
-    # This list stores the state of the condition for each subzone.
-    weightNotExceeded = []
     # Once known the contribution area(contactAreaIn), supposing an homogeneous density, calculate the weight contribution.
     itemWithWeightContribution = addWeightContributionTo(item)
     # Check if for each subzone the weight is exceeded.
-    for i in item["subzones"]:
-        weightNotExceeded.append(all(list(filter(lambda x: x is not None, map(
-            lambda x: (i[3] + x["weight"]) <= x["weight_limit"] if i[0] == x["id"] else None,
-            truckSubzones)))))
-    return [weightNotExceeded[0], itemWithWeightContribution]
+    weightNotExceeded = truckSubzones.fitsContributions(list(map(lambda x: x[0], item["subzones"])),
+                                                        np.array(list(map(lambda x: x[3], item["subzones"]))))
+    return [bool(weightNotExceeded[0]), itemWithWeightContribution]
 
 
 # ------------------ Stackability - C5 ---------------------------------------------
-def isStackable(item, placedItems):
+def getStackabilityLimits(item, placedItems, planeIndex=None):
     """
-    This function checks whether the stackability constraint is satisfied so the contributions
-    of weight for every object underneath does not exceed certain conditions.
+    This function gets, for every item underneath an item, the fraction of the base of the item resting on it and the
+    maximum weight it can hold.
 
     :param item: item object.
     :param placedItems: list of placed items.
-    :return: True is stackable, false otherwise.
+    :param planeIndex: index of the placed items by top plane height, used to find the items underneath if given.
+    :return: list of [fraction of the base, weight limit] for each item underneath.
     """
     # Reduce the scope of items to those sharing their top y Plane with bottom y Plane of the new item.
-    sharePlaneItems = list(
-        filter(lambda x: 0 <= abs(getBottomPlaneHeight(item) - getTopPlaneHeight(x)) <= 0.0016, placedItems))
-    # Store if we can stack an item above others.
-    stackableForSharePlaneItems = []
-    for i in sharePlaneItems:
-        # % of area between the newItem and the placed items underneath * newItem["weight"]
-        itemWeightContribution = (generalIntersectionArea(getZXPlaneFor(i), getZXPlaneFor(item)) / getBottomPlaneArea(
-            item)) * item["weight"]
-        # Portion of weight above fragile item cannot be more than 50% of the weight of the fragile item.
-        if i["fragility"] and itemWeightContribution <= 0.5 * i["weight"]:
-            stackableForSharePlaneItems.append(True)
-        # Weight above an item must not exceed its weight.
-        elif not i["fragility"] and itemWeightContribution <= i["weight"]:
-            stackableForSharePlaneItems.append(True)
-        else:
-            stackableForSharePlaneItems.append(False)
-    return all(stackableForSharePlaneItems)
+    sharePlaneItems = getSharePlaneItems(item, placedItems, 0.0016, planeIndex)
+    # Portion of weight above fragile item cannot be more than 50% of the weight of the fragile item.
+    # Weight above an item must not exceed its weight.
+    return list(map(lambda x: [generalIntersectionArea(getZXPlaneFor(x), getZXPlaneFor(item)) / getBottomPlaneArea(item),
+                               getWeightLimit(x)], sharePlaneItems))
 
 
-# ------------------ ADR cargo - C6 ------------------------------------------------
-def isADRSuitable(item, truckBRR_z):
+def isWithinStackabilityLimits(weight, stackabilityLimits):
     """
-    Checks whether an ADR packet can go into the container.
+    This function checks whether the weight contributions of an item to every item underneath are within their limits.
 
-    :param item: packet.
-    :param truckBRR_z: greater z coordinate of the container.
-    :return: True if the packet can be introduced, False otherwise.
+    :param weight: weight of the item.
+    :param stackabilityLimits: list of [fraction of the base, weight limit] for each item underneath.
+    :return: True is stackable, false otherwise.
     """
-    if item["ADR"]:
-        # This condition would really depend on the regulation. There are cases in which ADR packets can not be staked
-        # However, since this condition is just binary lets consider that
-        return max([item["width"], item["height"], item["length"]]) >= truckBRR_z - item["mass_center"][2]
-    else:
-        return True
+    # % of area between the newItem and the placed items underneath * newItem["weight"]
+    return all(list(map(lambda x: x[0] * weight <= x[1], stackabilityLimits)))
 
 
 # ------------------ Stability - C7 ------------------------------------------------
-def addContactAreaTo(item, placedItems):
+def addContactAreaTo(item, placedItems, heightMap=None, planeIndex=None):
     """
-    This function returns the item modified including the contact area in each subzone for it.
+    This function returns the placement of the item including the contact area in each subzone for it.
 
     :param item: item object with subzone format [[id_subzone, percentageIn],...].
     :param placedItems: list of placed items.
-    :return: item object with subzone format [[id_subzone, percentageIn, contactAreaIn],...].
-    """
-    newItem = deepcopy(item)
-    itemSubzones = deepcopy(item["subzones"])
+    :param heightMap: height map of the cargo, when given the contact area is taken from it.
+    :param planeIndex: index of the placed items by top plane height, used to find the items underneath if given.
+    :return: placement record with subzone format [[id_subzone, percentageIn, contactAreaIn],...].
+    """
+    itemSubzones = list(map(lambda x: list(x), item["subzones"]))
+    if heightMap is not None and not isInFloor(item):
+        # Supported area of the whole base, split among the subzones as the percentage of the item in each of them.
+        supportedArea = heightMap.getSupport(getBLF(item), getBRR(item), getBottomPlaneHeight(item), 0.0151)[1]
+    elif not isInFloor(item):
+        # Reduce the scope of items to those sharing their top y-axis Plane with bottom y-axis Plane of the new item.
+        sharePlaneItems = getSharePlaneItems(item, placedItems, 0.0151, planeIndex)
     # Go over the subzones the item is in.
     for i in itemSubzones:
         if isInFloor(item):
             totalContactAreaInSubzone = getBottomPlaneArea(item) * i[1]
+        elif heightMap is not None:
+            totalContactAreaInSubzone = supportedArea * i[1]
         else:
             # Reduce the scope of items to those in the same subzone
-            placedItemsSubzone = list(filter(lambda x: i[0] in getItemSubzones(x), placedItems))
-            # Reduce the scope of items to those sharing their top y-axis Plane with bottom y-axis Plane of the new item.
-            sharePlaneItems = list(
-                filter(lambda x: 0 <= abs(getBottomPlaneHeight(item) - getTopPlaneHeight(x)) <= 0.0151,
-                       placedItemsSubzone))
+            sharePlaneItemsSubzone = list(filter(lambda x: i[0] in getItemSubzones(x), sharePlaneItems))
             # Calculate the area of intersection between the sharedPlaneItems and the new item in a subzone.
             itemZXPlane = getZXPlaneFor(item)
             totalContactAreaInSubzone = sum(
-                list(map(lambda x: generalIntersectionArea(getZXPlaneFor(x), itemZXPlane), sharePlaneItems))) * i[1]
+                list(map(lambda x: generalIntersectionArea(getZXPlaneFor(x), itemZXPlane), sharePlaneItemsSubzone))) * i[1]
         # For each subzone the item is in we also have the contact area which is not the same as the percentage within the subzone.
         i.append(totalContactAreaInSubzone)
-    newItem["subzones"] = itemSubzones
-    return newItem
+    return PlacementRecord(item, itemSubzones)
 
 
-def isStable(item, placedItems, stage):
+def hasEnoughContactArea(itemWithContactArea, stage):
     """
-    This function checks whether the stability constraint is satisfied.
+    This function checks whether the contact area of an item is enough for it to be stable.
 
-    :param item: item object.
-    :param placedItems: list of items.
+    :param itemWithContactArea: item object with subzone format [[id_subzone, percentageIn, contactAreaIn],...].
     :param stage: the stage of the algorithm.
-    :return: True if feasible, false otherwise.
+    :return: [condition, item].
     """
     threshold = 0.8 if stage == 1 else 0.75
-    itemWithContactArea = addContactAreaTo(item, placedItems)
     totalItemContactArea = sum(list(map(lambda x: x[2], itemWithContactArea["subzones"])))
-    contactAreaPercentage = totalItemContactArea / getBottomPlaneArea(item)
+    contactAreaPercentage = totalItemContactArea / getBottomPlaneArea(itemWithContactArea)
     if contactAreaPercentage >= threshold:
         return [1, itemWithContactArea]
     return [0, itemWithContactArea]
 
 
-# ------------------ Physical constrains - Truck-related ----------------------------------------
-def isWithinTruckLength(item, truckLength):
+# ------------------ Physical constrains - Items-related ----------------------------------------
+
+def getSurroundingItems(referencePoint, placedItems, amountOfNearItems):
     """
-    This function checks whether an item is within truck's length in an insertion.
+    This function gets the neighbours of an item.
 
-    :param item: item object.
-    :param truckLength: truck/container length.
-    :return: True if within length, False otherwise.
+    :param referencePoint: ndarray with the coordinates of the reference.
+    :param placedItems: list of item objects.
+    :param amountOfNearItems: int with the number of desired neighbours.
+    :return: list of N neighbours, with N specified.
     """
-    return getBRR(item)[2] <= truckLength
+    if placedItems:
+        # Extract the mass center of all placed items.
+        itemsMCs = np.asarray(list(map(lambda x: x["mass_center"], placedItems)))
+        # Compute and sort the distances between the new item mass center and the rest.
+        ndxDistances = getComputedDistancesIndexes(referencePoint, itemsMCs)
+        # Get the nearest mass centers and its items.
+        return (np.asarray(placedItems)[ndxDistances[:min(len(placedItems), amountOfNearItems)]]).tolist()
+    return []
+
+
+def getComputedDistancesIndexes(massCenter, massCenters):
+    return np.sqrt(np.sum(np.square(massCenter - massCenters), axis=1)).argsort()
 
 
-def isWithinTruckWidth(item, truckWidth):
+def addItemToContainerIndexes(item, truck):
     """
-    This function checks whether an item is withing truck's width in an insertion.
+    This function registers a placed item in the search structures of the container.
 
-    :param item: item object.
-    :param truckWidth: truck/container width.
-    :return: True if within width, False otherwise.
+    :param item: placed item object.
+    :param truck: truck object.
+    :return: modified truck.
     """
-    return truckWidth >= getBRR(item)[0] and getBLF(item)[0] >= 0
+    blf = getBLF(item)
+    truck["grid"].insert(item["in_id"], blf, getTRR(item))
+    truck["store"].add(blf, np.array([item["width"], item["height"], item["length"]]))
+    truck["planeIndex"].add(item["in_id"], getTopPlaneHeight(item), item)
+    if "heightMap" in truck:
+        truck["heightMap"].insert(blf, getTRR(item))
+        # The height map only keeps the highest surface, so the item also hides the support of the places below it.
+        truck["feasibilityCache"].invalidate(blf, getTRR(item), 0.016, truck["heightMap"].resolution, True)
+    else:
+        # The places the item may support have to be checked again.
+        truck["feasibilityCache"].invalidate(blf, getTRR(item), 0.016)
+    return truck
+
 
+def physicalConstrainsForBoxes(potentialPoints, dims, weights, isADR, minDim, truck):
+    """
+    Checks the physical constraints of a set of boxes at once, each of them inserted in its own potential point.
 
-def isWithinTruckHeight(item, truckHeight):
+    :param potentialPoints: ndarray of cartesian points, one per row.
+    :param dims: ndarray with the width, height and length of each box, one per row.
+    :param weights: ndarray with the weight of each box.
+    :param isADR: ndarray with the ADR flag of each box.
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param truck: truck object.
+    :return: boolean ndarray, True for the boxes which satisfy the constraints.
     """
-    This function checks whether an item is withing truck's height in an insertion.
+    # Same mass center as setItemMassCenter, shifted to the left when the point is next to the right wall.
+    nextToRightWall = (truck["width"] - minDim <= potentialPoints[:, 0]) & (potentialPoints[:, 0] <= truck["width"])
+    massCenters = np.where(nextToRightWall[:, None], potentialPoints + dims * np.array([-1, 1, 1]) / 2,
+                           potentialPoints + dims / 2)
+    feasible = (truck["weight"] + weights <= truck["tonnage"]) \
+               & (massCenters[:, 2] + dims[:, 2] / 2 <= truck["length"]) \
+               & (truck["width"] >= massCenters[:, 0] + dims[:, 0] / 2) & (massCenters[:, 0] - dims[:, 0] / 2 >= 0) \
+               & (massCenters[:, 1] + dims[:, 1] / 2 <= truck["height"]) \
+               & (~isADR.astype(bool) | (dims.max(axis=1) >= getTruckBRR(truck)[2] - massCenters[:, 2]))
+    if feasible.any():
+        feasible[feasible] = ~truck["store"].intersectsAnyFor(massCenters[feasible] - dims[feasible] / 2,
+                                                              dims[feasible], grid=truck.get("grid"))
+    return feasible
 
+
+def physicalConstrainsFor(potentialPoints, item, minDim, truck):
+    """
+    Checks the physical constraints of an item in every potential point at once.
+
+    :param potentialPoints: ndarray of cartesian points, one per row.
     :param item: item object.
-    :param truckHeight: truck/container height.
-    :return: True if within height, False otherwise.
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param truck: truck object.
+    :return: boolean ndarray, True for the potential points in which the constraints are satisfied.
     """
-    return getTopPlaneHeight(item) <= truckHeight
+    nPPs = len(potentialPoints)
+    return physicalConstrainsForBoxes(potentialPoints,
+                                      np.tile([item["width"], item["height"], item["length"]], (nPPs, 1)),
+                                      np.full(nPPs, item["weight"]), np.full(nPPs, item["ADR"]), minDim, truck)
 
 
-def isWithinTruckDimensionsConstrains(item, truckDimensions):
+# --------------------- Helpers to the main module function -----------------------------------
+def getInsertionCacheEntry(insertion):
     """
-    This function checks whether the item satisfies container dimension requirements.
+    This function gets the entry of the feasibility cache for the place and dimensions of the item of an insertion.
 
-    :param item: the item object.
-    :param truckDimensions: dimensions of the container.
-    :return: True if within bounds, false otherwise.
+    :param insertion: dictionary with the placed items, the item, the truck, the stage and the cache of the check.
+    :return: list with format [stackability limits, subzones], where the unknown values are None.
     """
-    return isWithinTruckLength(item, truckDimensions["length"]) \
-           and isWithinTruckWidth(item, truckDimensions["width"]) \
-           and isWithinTruckHeight(item, truckDimensions["height"])
+    if "cacheEntry" not in insertion:
+        item = insertion["item"]
+        location = [item["mass_center"][0], getBottomPlaneHeight(item), item["mass_center"][2]]
+        itemKey = (item["width"], item["height"], item["length"])
+        entry = insertion["cache"].get(location, itemKey)
+        if entry is None:
+            entry = [None, None]
+            insertion["cache"].put(location, itemKey, entry, max(item["width"], item["length"]) / 2)
+        insertion["cacheEntry"] = entry
+    return insertion["cacheEntry"]
 
 
-# ------------------ Physical constrains - Items-related ----------------------------------------
+def getInsertionStackabilityLimits(insertion):
+    """
+    This function gets the stackability limits of the items underneath the item of an insertion.
 
-def overlapper(p1all, p2all):
+    :param insertion: dictionary with the placed items, the item, the truck, the stage and the cache of the check.
+    :return: list of [fraction of the base, weight limit] for each item underneath.
     """
-    This function checks whether an item overlaps other or not.
+    if insertion["cache"] is None:
+        return getStackabilityLimits(insertion["item"], insertion["placedItems"], insertion["truck"].get("planeIndex"))
+    entry = getInsertionCacheEntry(insertion)
+    if entry[0] is None:
+        entry[0] = getStackabilityLimits(insertion["item"], insertion["placedItems"],
+                                         insertion["truck"].get("planeIndex"))
+    return entry[0]
 
-    :param p1all: triplet of 3 planes.
-    :param p2all: triplet of 3 planes.
-    :return: True if the item does not overlap, False otherwise.
+
+def getInsertionWithContactArea(insertion):
     """
-    for i in range(len(p1all)):
-        if generalIntersectionArea(p1all[i], p2all[i]):
-            continue
-        # If there is a plane that does not overlap then we conclude there is not overlapping (hyperplane separation theorem)
+    This function gets the item of an insertion with its subzones and the contact area in each of them, computed
+    once per insertion.
+
+    :param insertion: dictionary with the placed items, the item, the truck, the stage and the cache of the check.
+    :return: placement record with subzone format [[id_subzone, percentageIn, contactAreaIn],...].
+    """
+    if "itemWithContactArea" not in insertion:
+        truck = insertion["truck"]
+        itemWithSubzones = setItemSubzones(truck["subzoneLedger"], insertion["item"])
+        if insertion["cache"] is None:
+            insertion["itemWithContactArea"] = addContactAreaTo(itemWithSubzones, insertion["placedItems"],
+                                                                truck.get("heightMap"), truck.get("planeIndex"))
         else:
-            return True
-    return False
+            entry = getInsertionCacheEntry(insertion)
+            if entry[1] is None:
+                entry[1] = addContactAreaTo(itemWithSubzones, insertion["placedItems"], truck.get("heightMap"),
+                                            truck.get("planeIndex"))["subzones"]
+            insertion["itemWithContactArea"] = PlacementRecord(itemWithSubzones,
+                                                               list(map(lambda x: list(x), entry[1])))
+    return insertion["itemWithContactArea"]
 
 
-def getSurroundingItems(referencePoint, placedItems, amountOfNearItems):
+def isInsertionStackable(insertion):
     """
-    This function gets the neighbours of an item.
+    This function checks the stackability constraint of an insertion.
 
-    :param referencePoint: ndarray with the coordinates of the reference.
-    :param placedItems: list of item objects.
-    :param amountOfNearItems: int with the number of desired neighbours.
-    :return: list of N neighbours, with N specified.
+    :param insertion: dictionary with the placed items, the item, the truck, the stage and the cache of the check.
+    :return: True if satisfied, False otherwise.
     """
-    if placedItems:
-        # Extract the mass center of all placed items.
-        itemsMCs = np.asarray(list(map(lambda x: x["mass_center"], placedItems)))
-        # Compute and sort the distances between the new item mass center and the rest.
-        ndxDistances = getComputedDistancesIndexes(referencePoint, itemsMCs)
-        # Get the nearest mass centers and its items.
-        return (np.asarray(placedItems)[ndxDistances[:min(len(placedItems), amountOfNearItems)]]).tolist()
-    return []
+    return isWithinStackabilityLimits(insertion["item"]["weight"], getInsertionStackabilityLimits(insertion))
 
 
-def getComputedDistancesIndexes(massCenter, massCenters):
-    return np.sqrt(np.sum(np.square(massCenter - massCenters), axis=1)).argsort()
+def isInsertionStable(insertion):
+    """
+    This function checks the stability constraint of an insertion.
+
+    :param insertion: dictionary with the placed items, the item, the truck, the stage and the cache of the check.
+    :return: True if satisfied, False otherwise.
+    """
+    return bool(hasEnoughContactArea(getInsertionWithContactArea(insertion), insertion["stage"])[0])
 
 
-def isNotOverlapping(item, placedItems):
+def isInsertionWithinSubzonesWeightLimits(insertion):
     """
-    This function checks if an item is overlapping others and vice versa.
+    This function checks the subzones weight limits of an insertion, adding the weight contributions to its item.
 
-    :param item: item object.
-    :param placedItems: list of placed item objects.
-    :return: True if the item does not overlap other items around it, False otherwise.
-    """
-    if len(placedItems):
-        nearItems = getSurroundingItems(item["mass_center"].reshape(1, 3), placedItems,
-                                        max(int(len(placedItems) * 0.15), 25))
-        # Generate points for item evaluated.
-        p1all = getPlanesFor(item)
-        # Validate overlapping conditions item vs. placedItems and vice versa.
-        itemToNearItemsNotOverlapping = all(list(map(lambda x: overlapper(p1all, getPlanesFor(x)), nearItems)))
-        return itemToNearItemsNotOverlapping
-    else:
-        return True
+    :param insertion: dictionary with the placed items, the item, the truck, the stage and the cache of the check.
+    :return: True if satisfied, False otherwise.
+    """
+    return itemContributionNotExceedingSubzonesWeightLimit(getInsertionWithContactArea(insertion),
+                                                           insertion["truck"]["subzoneLedger"])[0]
+
+
+# Constraints related to the cargo already placed under the item, in their initial order.
+LOAD_CONSTRAINTS = [("stackability", isInsertionStackable), ("stability", isInsertionStable),
+                    ("subzonesWeightLimits", isInsertionWithinSubzonesWeightLimits)]
 
 
-def physicalConstrains(placedItems, item, truck):
+def getConstraintPipeline(truck):
     """
-    Checks whether the physical constraints are satisfied.
+    This function gets the constraint pipeline of the container, a new one if it has none.
 
-    :param placedItems: list of already packed items.
-    :param item: item object.
     :param truck: truck object.
-    :return: True if they are all satisfied, false otherwise.
+    :return: ConstraintPipeline object.
     """
-    return not isWeightExceeded(item, truck) \
-           and isWithinTruckDimensionsConstrains(item, {"width": truck["width"], "height": truck["height"],
-                                                        "length": truck["length"]}) \
-           and isADRSuitable(item, getTruckBRR(truck)[2]) \
-           and isNotOverlapping(item, placedItems)
+    return truck["constraintPipeline"] if "constraintPipeline" in truck else ConstraintPipeline(LOAD_CONSTRAINTS)
 
 
-# --------------------- Helpers to the main module function -----------------------------------
-def isFeasible(potentialPoint, placedItems, newItem, minDim, truck, stage):
+def evaluateLoadConstrains(placedItems, item, truck, stage, names, cache=None):
     """
-    This function checks if a potential point is feasible for the insertion of an item, meaning it satisfies all the conditions.
+    This function checks constraints related to the cargo already placed under the item with the constraint
+    pipeline of the container.
 
-    :param potentialPoint: list of cartesian points.
-    :param newItem: item object representing the packet to be inserted.
-    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
     :param placedItems: list of items that have been already placed inside the container.
+    :param item: item object with its mass center set.
     :param truck: truck object.
     :param stage: packing stage of the algorithm.
-    :return: True if the item can be inserted in the potential point, False otherwise.
-    """
-    item = setItemMassCenter(newItem, potentialPoint, truck["width"], minDim)
-
-    # Conditions to be checked sequentially to improve performance.
-    if physicalConstrains(placedItems, item, truck):
-        truckSubzones = getContainerSubzones(truck)
-        itemWithSubzones = setItemSubzones(truckSubzones, item)
-        # This item is [condition, itemWithContactAreaForEachSubzone]
-        i3WithCondition = isStable(itemWithSubzones, placedItems, stage)
-        # Checks if it is stable and stackable.
-        if i3WithCondition[0] and isStackable(item, placedItems):
-            # Way of keeping the modified object and if the condition state.
-            i4WithCondition = itemContributionNotExceedingSubzonesWeightLimit(i3WithCondition[1], truckSubzones)
-            if i4WithCondition[0]:
-                return [1, i4WithCondition[1]]
-            else:
-                return [0, newItem]
-        else:
-            return [0, newItem]
-    else:
-        return [0, newItem]
+    :param names: names of the constraints to be checked.
+    :param cache: feasibility cache of the container, if given what only depends on the cargo underneath the item is
+    taken from it.
+    :return: [condition, item], with the item including its subzones contributions if feasible.
+    """
+    insertion = {"placedItems": placedItems, "item": item, "truck": truck, "stage": stage, "cache": cache}
+    if "searchBudget" in truck:
+        truck["searchBudget"].spend()
+    if getConstraintPipeline(truck).evaluate(insertion, stage, names):
+        return [1, getInsertionWithContactArea(insertion)]
+    return [0, item]
 
 
-def areaConstraint(currentAreas, maxAreas, item):
+def stabilityConstrains(placedItems, item, truck, stage):
     """
-    This function checks if the assigned area of a destination is exceeded after an insertion of a new packet.
+    This function checks the stability of the item and the subzones weight limits.
 
-    :param currentAreas: current area occupied for each destination.
-    :param maxAreas: maximum area allowed to a certain destination.
-    :param item: item object.
-    :return: True if current area after insertion does not exceed the maximum allowed.
+    :param placedItems: list of items that have been already placed inside the container.
+    :param item: item object with its mass center set.
+    :param truck: truck object.
+    :param stage: packing stage of the algorithm.
+    :return: [condition, item], with the item including its subzones contributions if feasible.
+    """
+    return evaluateLoadConstrains(placedItems, item, truck, stage, ["stability", "subzonesWeightLimits"])
+
+
+def loadConstrains(placedItems, item, truck, stage):
+    """
+    This function checks the constraints related to the cargo already placed under the item: stackability,
+    stability and subzones weight limits.
+
+    :param placedItems: list of items that have been already placed inside the container.
+    :param item: item object with its mass center set.
+    :param truck: truck object.
+    :param stage: packing stage of the algorithm.
+    :return: [condition, item], with the item including its subzones contributions if feasible.
+    """
+    return evaluateLoadConstrains(placedItems, item, truck, stage, None)
+
+
+def cachedLoadConstrains(placedItems, item, truck, stage, cache):
+    """
+    This function checks the same constraints as loadConstrains, taking what only depends on the cargo underneath the
+    item (the fraction of its base on each item below and its contact area) from the cache when an item with the same
+    dimensions was already checked in the same place. The weight of the item, the stage and the subzones weight limits
+    are applied on every check.
+
+    :param placedItems: list of items that have been already placed inside the container.
+    :param item: item object with its mass center set.
+    :param truck: truck object.
+    :param stage: packing stage of the algorithm.
+    :param cache: feasibility cache of the container.
+    :return: [condition, item], with the item including its subzones contributions if feasible.
     """
-    return currentAreas[0][item["dstCode"]] + getBottomPlaneArea(item) <= maxAreas[item["dstCode"]]
+    return evaluateLoadConstrains(placedItems, item, truck, stage, None, cache)
 
 
-def feasibleInFillingBase(potentialPoint, placedItems, newItem, currentAreas, maxAreas, minDim, truck):
+def getPhysicallyFeasiblePPsFor(item, potentialPoints, minDim, truck, stage):
     """
-    This function checks if a potential point is feasible for the insertion of an item, meaning it satisfies all the conditions.
-    During the base filling stage.
+    This function checks the physical constraints of an item in every potential point at once.
 
-    :param potentialPoint: list of cartesian points.
-    :param newItem: item object representing the packet to be inserted.
+    :param item: item object representing the packet to be inserted.
+    :param potentialPoints: ndarray of cartesian points, one per row.
     :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param truck: truck object.
+    :param stage: packing stage of the algorithm.
+    :return: ndarray with the potential points that passed, in the same order.
+    """
+    start = time.perf_counter()
+    physicallyFeasible = physicalConstrainsFor(potentialPoints, item, minDim, truck)
+    getConstraintPipeline(truck).record(stage, "physical", len(potentialPoints),
+                                        len(potentialPoints) - np.count_nonzero(physicallyFeasible),
+                                        time.perf_counter() - start)
+    return potentialPoints[physicallyFeasible]
+
+
+def getLoadFeasibilityFor(item, potentialPoint, placedItems, minDim, truck, stage):
+    """
+    This function checks the constraints related to the cargo underneath an item inserted in a potential point.
+
+    :param item: item object representing the packet to be inserted.
+    :param potentialPoint: cartesian point.
     :param placedItems: list of items that have been already placed inside the container.
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
     :param truck: truck object.
+    :param stage: packing stage of the algorithm.
+    :return: [condition, item], with the item including its subzones contributions if feasible.
+    """
+    if "feasibilityCache" in truck:
+        return cachedLoadConstrains(placedItems, setItemMassCenter(item, potentialPoint, truck["width"], minDim), truck,
+                                    stage, truck["feasibilityCache"])
+    return loadConstrains(placedItems, setItemMassCenter(item, potentialPoint, truck["width"], minDim), truck, stage)
+
+
+def getFeasiblePPsFor(item, potentialPoints, placedItems, minDim, truck, stage):
+    """
+    This function checks in which potential points an item can be inserted. The physical constraints are checked for
+    all the potential points at once and the rest of them only for the points that passed.
+
+    :param item: item object representing the packet to be inserted.
+    :param potentialPoints: ndarray of cartesian points, one per row.
+    :param placedItems: list of items that have been already placed inside the container.
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param truck: truck object.
+    :param stage: packing stage of the algorithm.
+    :return: list of [potentialPoint, item] for the feasible points, in the same order as the potential points.
+    """
+    potentialPoints = np.asarray(potentialPoints, dtype=float).reshape(-1, 3)
+    feasiblePPs = []
+    for pp in getPhysicallyFeasiblePPsFor(item, potentialPoints, minDim, truck, stage):
+        feasibility = getLoadFeasibilityFor(item, pp, placedItems, minDim, truck, stage)
+        if feasibility[0]:
+            feasiblePPs.append([pp, feasibility[1]])
+    # Leave the item in the last potential point as if all of them had been checked one by one.
+    if len(potentialPoints):
+        setItemMassCenter(item, potentialPoints[-1], truck["width"], minDim)
+    return feasiblePPs
+
+
+def getBestPPFor(item, potentialPoints, placedItems, minDim, truck, stage, notPlacedMaxWeight, nDst, coefficients,
+                 bestFirstSearch=0):
+    """
+    This function gets the best feasible potential point for an item. In the best-first search the potential points
+    that passed the physical constraints are checked in descending order of the upper bound of their fitness, in
+    blocks, until the bound falls below the best fitness found. The points left out cannot reach the best fitness,
+    so the result is the same as checking all of them.
+
+    :param item: item object representing the packet to be inserted.
+    :param potentialPoints: ndarray of cartesian points, one per row.
+    :param placedItems: list of items that have been already placed inside the container.
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param truck: truck object.
+    :param stage: packing stage of the algorithm.
+    :param notPlacedMaxWeight: maximum weight of not yet placed items.
+    :param nDst: number of destinations.
+    :param coefficients: weights of the fitness function.
+    :param bestFirstSearch: 1 to search in order of the fitness upper bounds, 0 to check every potential point.
+    :return: [[potentialPoint, fitness], item] of the best insertion, None if there is no feasible potential point
+    with a fitness greater than zero.
+    """
+    potentialPoints = np.asarray(potentialPoints, dtype=float).reshape(-1, 3)
+    if not bestFirstSearch:
+        feasiblePPs = getFeasiblePPsFor(item, potentialPoints, placedItems, minDim, truck, stage)
+        if not feasiblePPs:
+            return None
+        PPs = np.asarray(list(map(lambda x: x[0], feasiblePPs)))
+        fitness = fitnessForAll(PPs, list(map(lambda x: x[1], feasiblePPs)), placedItems, notPlacedMaxWeight,
+                                truck["height"], truck["length"], stage, nDst, coefficients, truck.get("planeIndex"))
+    else:
+        # [index among the candidates, potential point, item, fitness] of the feasible potential points.
+        feasiblePPs = []
+        candidates = getPhysicallyFeasiblePPsFor(item, potentialPoints, minDim, truck, stage)
+        bounds = fitnessUpperBoundsFor(candidates, item, notPlacedMaxWeight, truck["height"], truck["length"], stage,
+                                       nDst, coefficients)
+        order = np.argsort(-bounds, kind="stable")
+        bestFitness = 0
+        for block in range(0, len(order), 8):
+            # Nothing below the best fitness can be the best, but the ties still compete by their position.
+            if bounds[order[block]] <= 0 or bounds[order[block]] < bestFitness:
+                break
+            blockPPs = []
+            for c in order[block:block + 8]:
+                feasibility = getLoadFeasibilityFor(item, candidates[c], placedItems, minDim, truck, stage)
+                if feasibility[0]:
+                    blockPPs.append([c, candidates[c], feasibility[1]])
+            if blockPPs:
+                fitness = fitnessForAll(np.asarray(list(map(lambda x: x[1], blockPPs))),
+                                        list(map(lambda x: x[2], blockPPs)), placedItems, notPlacedMaxWeight,
+                                        truck["height"], truck["length"], stage, nDst, coefficients,
+                                        truck.get("planeIndex"))
+                bestFitness = max(bestFitness, np.max(fitness))
+                feasiblePPs.extend(map(lambda x: x[0] + [x[1]], zip(blockPPs, fitness)))
+        # Leave the item in the last potential point as if all of them had been checked one by one.
+        if len(potentialPoints):
+            setItemMassCenter(item, potentialPoints[-1], truck["width"], minDim)
+        if not feasiblePPs:
+            return None
+        # Back to the order of the potential points, which breaks the last ties.
+        feasiblePPs = sorted(feasiblePPs, key=lambda x: x[0])
+        PPs = np.asarray(list(map(lambda x: x[1], feasiblePPs)))
+        fitness = np.asarray(list(map(lambda x: x[3], feasiblePPs)))
+        feasiblePPs = list(map(lambda x: x[1:3], feasiblePPs))
+    best = getBestPPIndex(PPs, fitness, truck["width"])
+    if best is None:
+        return None
+    return [[PPs[best], fitness[best]], feasiblePPs[best][1]]
+
+
+def evaluateBaseCandidatesFor(potentialPoint, candidates, currentAreas, maxAreas, minDim, truck, nDst, maxWeight,
+                              coefficients):
+    """
+    This function evaluates at once every candidate in every feasible orientation inserted in a potential point
+    of the floor. It checks the area constraint and the physical constraints, and computes the fitness of the
+    insertion from the weight, the distance to the front and the priority of the item, once for each distinct
+    orientation.
+
+    :param potentialPoint: cartesian point in the floor.
+    :param candidates: list of items of the destination.
     :param currentAreas: current area occupied for each destination.
     :param maxAreas: maximum area allowed to a certain destination.
-    :return: True if feasible for insertion, False otherwise. Plus the item adapted.
-    """
-    item = setItemMassCenter(newItem, potentialPoint, truck["width"], minDim)
-
-    if areaConstraint(currentAreas, maxAreas, item):
-        if physicalConstrains(placedItems, item, truck):
-            truckSubzones = getContainerSubzones(truck)
-            itemWithSubzones = setItemSubzones(truckSubzones, item)
-            # This item is [condition, itemWithContactAreaForEachSubzone]
-            i3WithCondition = isStable(itemWithSubzones, placedItems, 0)
-            # Checks if it is stable and stackable.
-            if i3WithCondition[0]:
-                # Way of keeping the modified object and if the condition state.
-                i4WithCondition = itemContributionNotExceedingSubzonesWeightLimit(i3WithCondition[1], truckSubzones)
-                if i4WithCondition[0]:
-                    return [1, i4WithCondition[1]]
-                else:
-                    return [0, newItem]
-            else:
-                return [0, newItem]
-        return [0, newItem]
-    return [0, newItem]
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param truck: truck object.
+    :param nDst: number of destinations.
+    :param maxWeight: maximum weight of the candidate list.
+    :param coefficients: weights of the fitness function.
+    :return: tuple of two lists, one entry per candidate, with ndarrays of the feasibility and the fitness
+    in each of its feasible orientations.
+    """
+    dims, weights, priorities, isADR, dstCodes, nOrientations = [], [], [], [], [], []
+    # Row of the distinct orientation with the dimensions of each feasible orientation of each candidate.
+    rows = []
+    for i in candidates:
+        distinctRows = {}
+        for o in getDistinctOrientations(i):
+            distinctRows[getDimensionsInOrientation(i, o)] = len(dims)
+            dims.append(getDimensionsInOrientation(i, o))
+            weights.append(i["weight"])
+            priorities.append(i["priority"])
+            isADR.append(i["ADR"])
+            dstCodes.append(i["dstCode"])
+        rows.extend(map(lambda x: distinctRows[getDimensionsInOrientation(i, x)], i["feasibleOr"]))
+        nOrientations.append(len(i["feasibleOr"]))
+    if not len(dims):
+        return [], []
+    dims, weights, priorities = np.asarray(dims, dtype=float), np.asarray(weights), np.asarray(priorities)
+    potentialPoints = np.tile(np.asarray(potentialPoint, dtype=float), (len(dims), 1))
+    start = time.perf_counter()
+    feasible = (currentAreas[0][dstCodes] + dims[:, 2] * dims[:, 0] <= maxAreas[dstCodes]) \
+               & physicalConstrainsForBoxes(potentialPoints, dims, weights, np.asarray(isADR), minDim, truck)
+    getConstraintPipeline(truck).record(0, "physical", len(dims), len(dims) - np.count_nonzero(feasible),
+                                        time.perf_counter() - start)
+    fitWeights = coefficients if nDst > 1 else [coefficients[0], coefficients[1], coefficients[2]]
+    # The z-coordinate of the mass center does not depend on the side the item is inserted from.
+    fitness = (weights / maxWeight) * fitWeights[0] + (
+            1 - ((potentialPoints[:, 2] + dims[:, 2] / 2) / truck["length"])) * fitWeights[1] + priorities * fitWeights[2]
+    splits = np.cumsum(nOrientations)[:-1]
+    return np.split(feasible[rows], splits), np.split(fitness[rows], splits)
 
 
 def areEnoughPlacedItemsOfTheCstCode(dstCode, placedItems, nItems):
@@ -494,96 +641,135 @@ def areEnoughPlacedItemsOfTheCstCode(dstCode, placedItems, nItems):
     return len(list(filter(lambda x: dstCode == x["dstCode"], placedItems))) >= nItems
 
 
-def fitnessFor(PP, item, placedItems, notPlacedMaxWeight, maxHeight, maxLength, stage, nDst, coeffs):
+def fitnessForAll(potentialPoints, items, placedItems, notPlacedMaxWeight, maxHeight, maxLength, stage, nDst, coeffs,
+                  planeIndex=None):
     """
-    This function computes the fitness value for a potential point.
+    This function computes at once the fitness values of the feasible insertions of an item. The neighbours of
+    all the insertions are taken from a single distance matrix and the items behind are searched once per height
+    of the bottom plane.
 
-    :param nDst: number of destinations.
-    :param PP: potential point input, it only contains the coordinates in [x, y, z].
-    :param item: item object.
+    :param potentialPoints: ndarray of potential points, one per row.
+    :param items: item objects inserted in each of the potential points.
     :param placedItems: set of placed items into the container.
     :param notPlacedMaxWeight: maximum weight of not yet placed items.
     :param maxHeight: maximum height of the truck.
     :param maxLength: maximum length of the truck.
     :param stage: stage in the algorithm.
-    :return: potential point with fitness, format [x, y, z, fitness].
+    :param nDst: number of destinations.
+    :param coeffs: weights of the fitness function.
+    :param planeIndex: index of the placed items by top plane height, used to find the items underneath if given.
+    :return: ndarray with the fitness value of each insertion.
     """
-
     fitWeights = [coeffs[:5],
                   coeffs[5:],
                   coeffs[5:]] if nDst > 1 else [[coeffs[0], 0, coeffs[2], coeffs[3], coeffs[4]],
                                                 [coeffs[5], 0, coeffs[7], coeffs[8], coeffs[9]],
                                                 [coeffs[5], 0, coeffs[7], coeffs[8], coeffs[9]]]
-    # Take the weights of the stage.
     stageFW = fitWeights[stage - 1]
-    # Length condition in the fitness function, tries to be attracted by the origin.
-    lengthCondition = 1 - (getEuclideanDistanceTo(np.array([[0, 0, 0]]), PP) / maxLength)
-
-    if nDst > 1:
-        # For the surrounding customer code objects.
-        nItems = 5
-        nearItems = getSurroundingItems(item["mass_center"], placedItems, nItems)
-        # Consider valid dst code the same or the previous.
-        nearItemsWithValidDstCode = list(
-            filter(lambda x: x["dstCode"] == item["dstCode"], nearItems))
-        surroundingCondition = len(nearItemsWithValidDstCode) / max(len(nearItems), 1)
+    potentialPoints = np.asarray(potentialPoints, dtype=float).reshape(-1, 3)
+    massCenters = np.asarray(list(map(lambda x: x["mass_center"], items)), dtype=float).reshape(-1, 3)
+    areas = np.asarray(list(map(getBottomPlaneArea, items)), dtype=float)
+    dstCode, weight, priority = items[0]["dstCode"], items[0]["weight"], items[0]["priority"]
+    lengthCondition = 1 - (getEuclideanDistanceTo(np.array([[0, 0, 0]]), potentialPoints) / maxLength)
+
+    if nDst > 1 and placedItems:
+        # Same neighbours as getSurroundingItems, for all the mass centers at once.
+        nItems = min(len(placedItems), 5)
+        placedMCs = np.asarray(list(map(lambda x: x["mass_center"], placedItems)))
+        placedDstCodes = np.asarray(list(map(lambda x: x["dstCode"], placedItems)))
+        distances = np.sqrt(np.sum(np.square(massCenters[:, np.newaxis, :] - placedMCs[np.newaxis, :, :]), axis=2))
+        nearDstCodes = placedDstCodes[distances.argsort(axis=1)[:, :nItems]]
+        surroundingCondition = np.sum(nearDstCodes == dstCode, axis=1) / nItems
     else:
-        surroundingCondition = 0
-
-    # Height condition in the fitness function.
-    heightWeightRelation = 1 - ((item["weight"] / notPlacedMaxWeight)-0.5) * (item["mass_center"][1] / maxHeight)/0.5
-
-    # Item not in floor.
-    if PP[1]:
-        # Get the item that generated the potential point in which the new item is being inserted.
-        sharePlaneItems = list(
-            filter(lambda x: 0 <= abs(getBottomPlaneHeight(item) - getTopPlaneHeight(x)) <= 0.0016,
-                   placedItems))
-        itemBehind = getSurroundingItems(PP, sharePlaneItems, 1)[0]
-
+        surroundingCondition = np.zeros(len(potentialPoints))
+
+    heightWeightRelation = 1 - ((weight / notPlacedMaxWeight) - 0.5) * (massCenters[:, 1] / maxHeight) / 0.5
+
+    # Items not in floor, the area condition is zero for the rest.
+    areaCondition = np.zeros(len(potentialPoints))
+    notInFloor = np.flatnonzero(potentialPoints[:, 1] != 0)
+    bottomHeights = np.asarray(list(map(lambda x: getBottomPlaneHeight(items[x]), notInFloor)))
+    for height in np.unique(bottomHeights):
+        rows = notInFloor[bottomHeights == height]
+        # Get the items that generated the potential points in which the item is being inserted.
+        sharePlaneItems = getSharePlaneItems(items[rows[0]], placedItems, 0.0016, planeIndex)
+        # No placed item has its top in the plane, so there is no item behind to compare with.
+        if not len(sharePlaneItems):
+            continue
+        sharePlaneMCs = np.asarray(list(map(lambda x: x["mass_center"], sharePlaneItems)))
+        distances = np.sqrt(np.sum(np.square(potentialPoints[rows, np.newaxis, :] - sharePlaneMCs[np.newaxis, :, :]),
+                                   axis=2))
+        itemsBehind = list(map(lambda x: sharePlaneItems[x], distances.argsort(axis=1)[:, 0]))
         # This is a way to avoid mistaken subgrouping in the latest packing stages.
         if stage == 3:
-            surroundingCondition = -stageFW[3] if item["dstCode"] < itemBehind["dstCode"] else surroundingCondition
+            isBehindLater = np.asarray(list(map(lambda x: dstCode < x["dstCode"], itemsBehind)))
+            surroundingCondition[rows] = np.where(isBehindLater, -stageFW[3], surroundingCondition[rows])
         # Check how similar are the areas between the item being inserted and the item behind.
-        areaCondition = 1 - abs(1 - (getBottomPlaneArea(item) / getBottomPlaneArea(itemBehind)))
-        areaCondition = areaCondition if (1 >= areaCondition >= 0) else 0
-        fitvalue = lengthCondition * stageFW[0] + surroundingCondition * stageFW[1] + \
-                   areaCondition * stageFW[2] + heightWeightRelation * stageFW[3] + item["priority"] * stageFW[4]
-        fitvalue = fitvalue if fitvalue >= 0 else 0
-        return [PP, fitvalue]
-    else:
-        fitvalue = lengthCondition * stageFW[0] + surroundingCondition * stageFW[1] + heightWeightRelation * stageFW[3] + item["priority"] * stageFW[4]
-        # Threshold in fitness value. TODO, maybe change the threshold depending on the stage.
-        fitvalue = fitvalue if fitvalue >= 0 else 0
-        return [PP, fitvalue]
+        condition = 1 - np.abs(1 - (areas[rows] / np.asarray(list(map(getBottomPlaneArea, itemsBehind)))))
+        areaCondition[rows] = np.where((1 >= condition) & (condition >= 0), condition, 0)
+
+    fitness = lengthCondition * stageFW[0] + surroundingCondition * stageFW[1] + areaCondition * stageFW[2] + \
+              heightWeightRelation * stageFW[3] + priority * stageFW[4]
+    return np.where(fitness >= 0, fitness, 0)
 
 
-def fitnessForBase(PP, item, containerLength, nDst, placedItems, maxWeight, coefficients):
+def fitnessUpperBoundsFor(potentialPoints, item, notPlacedMaxWeight, maxHeight, maxLength, stage, nDst, coeffs):
     """
-    This function computes the fitness value for a potential point.
+    This function computes an upper bound of the fitness value of an item in each potential point before checking
+    its feasibility. The length, height-weight and priority terms are computed as fitnessForAll does, and the
+    surrounding and area terms are replaced by their highest possible contribution.
 
-    :param maxWeight: maximum weight of the candidate list.
-    :param nDst: number of destinations.
-    :param PP: potential point input, it only contains the coordinates in [x, y, z].
+    :param potentialPoints: ndarray of potential points, one per row.
     :param item: item object.
-    :param placedItems: set of placed items into the container.
-    :return: potential point with fitness, format [x, y, z, fitness].
+    :param notPlacedMaxWeight: maximum weight of not yet placed items.
+    :param maxHeight: maximum height of the truck.
+    :param maxLength: maximum length of the truck.
+    :param stage: stage in the algorithm.
+    :param nDst: number of destinations.
+    :param coeffs: weights of the fitness function.
+    :return: ndarray with the upper bound of the fitness value in each potential point.
     """
-    fitWeights = coefficients if nDst > 1 else [coefficients[0], coefficients[1], coefficients[2]]
-    if nDst > 1:
-        # For the surrounding customer code objects.
-        nItems = 5
-        nearItems = getSurroundingItems(item["mass_center"], placedItems, nItems)
-        # Consider valid dst code the same or the previous.
-        nearItemsWithValidDstCode = list(
-            filter(lambda x: x["dstCode"] == item["dstCode"], nearItems))
-        surroundingCondition = len(nearItemsWithValidDstCode) / max(len(nearItems), 1)
-    else:
-        surroundingCondition = 0
-    #TODO, delete the surrounding condition.
-    fitnessValue = (item["weight"] / maxWeight) * fitWeights[0] + (
-            1 - (item["mass_center"][2] / containerLength)) * fitWeights[1] + item["priority"] * fitWeights[2]
-    return [PP, fitnessValue]
+    fitWeights = [coeffs[:5],
+                  coeffs[5:],
+                  coeffs[5:]] if nDst > 1 else [[coeffs[0], 0, coeffs[2], coeffs[3], coeffs[4]],
+                                                [coeffs[5], 0, coeffs[7], coeffs[8], coeffs[9]],
+                                                [coeffs[5], 0, coeffs[7], coeffs[8], coeffs[9]]]
+    stageFW = fitWeights[stage - 1]
+    potentialPoints = np.asarray(potentialPoints, dtype=float).reshape(-1, 3)
+    notInFloor = potentialPoints[:, 1] != 0
+    lengthCondition = 1 - (getEuclideanDistanceTo(np.array([[0, 0, 0]]), potentialPoints) / maxLength)
+    # Same height of the mass center as setItemMassCenter.
+    massCentersY = potentialPoints[:, 1] + item["height"] / 2
+    heightWeightRelation = 1 - ((item["weight"] / notPlacedMaxWeight) - 0.5) * (massCentersY / maxHeight) / 0.5
+    # The share of neighbours with the same destination is in [0, 1], and in the last stage it may be replaced.
+    # A term in [0, 1] is highest at 1 with a positive weight and at 0 with a negative one, hence the clamps.
+    surroundingBound = max(0, stageFW[1])
+    surroundingTerm = np.full(len(potentialPoints), surroundingBound, dtype=float)
+    if stage == 3:
+        surroundingTerm[notInFloor] = max(surroundingBound, -stageFW[3] * stageFW[1])
+    # The area condition is in [0, 1] out of the floor and zero in it.
+    areaTerm = np.where(notInFloor, max(0, stageFW[2]), 0)
+    bounds = lengthCondition * stageFW[0] + surroundingTerm + areaTerm + \
+             heightWeightRelation * stageFW[3] + item["priority"] * stageFW[4]
+    return np.where(bounds >= 0, bounds, 0)
+
+
+def getBestPPIndex(potentialPoints, fitness, truckWidth):
+    """
+    This function gets the best of a set of potential points with the same ranking as comparing them one by one
+    with isBetterPP, starting from the worst potential point: the highest fitness value, then the closest to
+    the walls and then the last one.
+
+    :param potentialPoints: ndarray of potential points, one per row.
+    :param fitness: ndarray with the fitness value of each potential point.
+    :param truckWidth: the width of the truck.
+    :return: index of the best potential point, None if no fitness value is greater than zero.
+    """
+    if not len(fitness) or np.max(fitness) <= 0:
+        return None
+    candidates = np.flatnonzero(fitness == np.max(fitness))
+    wallDistances = -np.abs(np.asarray(potentialPoints, dtype=float).reshape(-1, 3)[candidates, 0] - truckWidth / 2)
+    return candidates[np.flatnonzero(wallDistances == np.min(wallDistances))[-1]]
 
 
 def isBetterPP(newPP, currentBest, truckWidth, base):
@@ -608,7 +794,7 @@ def isBetterPP(newPP, currentBest, truckWidth, base):
         logging.error("Error while estimating better PP")
 
         
-def generateNewPPs(item, placedItems, truckHeight, truckWidth, minDim, stage):
+def generateNewPPs(item, placedItems, truckHeight, truckWidth, minDim, stage, heightMap=None, planeIndex=None):
     """
     This function creates a list of potential points from a packet after its insertion. Depending on the
     situation and the packet location it will generate the points including different corners.
@@ -619,6 +805,8 @@ def generateNewPPs(item, placedItems, truckHeight, truckWidth, minDim, stage):
     :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
     :param placedItems: list of items that have been already placed inside the container.
     :param stage: stage the packing is at.
+    :param heightMap: height map of the cargo, when given the projections are taken from it.
+    :param planeIndex: index of the placed items by top plane height, used to find the items underneath if given.
     :return: array of new potential points.
     """
     # Add margin to z-coordinate.
@@ -637,16 +825,15 @@ def generateNewPPs(item, placedItems, truckHeight, truckWidth, minDim, stage):
         result = np.array([TLF]) if TLF[1] < truckHeight - minDim else []
     if not isInFloor(item):
         # Reduce the scope of items to those sharing their top y-axis Plane with bottom y-axis Plane of the new item.
-        sharePlaneItems = list(
-            filter(lambda x: 0 <= abs(getBottomPlaneHeight(item) - getTopPlaneHeight(x)) <= 0.0016, placedItems))
+        sharePlaneItems = getSharePlaneItems(item, placedItems, 0.0016, planeIndex)
         # Check which points are not supported.
         isBLRInPlane = any(list(map(lambda x: pointInPlane(BLR, getBLF(x), getBRR(x)), sharePlaneItems)))
         isBRxInPlane = any(list(map(lambda x: pointInPlane(BRx, getBLF(x), getBRR(x)), sharePlaneItems)))
         # Modify not supported points to its projection.
         if not isBRxInPlane:
-            BRx = getNearestProjectionPointFor(BRx, placedItems)
+            BRx = getNearestProjectionPointFor(BRx, placedItems, heightMap)
         if not isBLRInPlane:
-            BLR = getNearestProjectionPointFor(BLR, placedItems)
+            BLR = getNearestProjectionPointFor(BLR, placedItems, heightMap)
     if len(result):
         if not stage:
             if TRF[0] >= truckWidth - minDim:
@@ -668,6 +855,33 @@ def generateNewPPs(item, placedItems, truckHeight, truckWidth, minDim, stage):
     return result
 
 
+def createPotentialPointStore(points, truck):
+    """
+    This function creates a store of potential points, with the points kept in the nodes of the grid of the
+    coordinate unit of the container if it has one.
+
+    :param points: cartesian points, one per row.
+    :param truck: truck object.
+    :return: PotentialPointStore object.
+    """
+    if truck.get("coordinateUnit"):
+        return PotentialPointStore(truck["width"], points, truck["coordinateUnit"], True)
+    return PotentialPointStore(truck["width"], points)
+
+
+def getGapFor(truck):
+    """
+    This function gets the gap kept between the items by the walls, the columns and the empty maximal spaces. With a
+    coordinate unit it is rounded down to the unit, as the potential points are, so the items stay in its grid.
+
+    :param truck: truck object.
+    :return: gap in metres.
+    """
+    if truck.get("coordinateUnit"):
+        return round(math.floor(0.0015 / truck["coordinateUnit"] + 0.000001) * truck["coordinateUnit"], 10)
+    return 0.0015
+
+
 def getCandidatesByDestination(candidates, nDst, index):
     if nDst == 1:
         return candidates[index]
@@ -688,6 +902,88 @@ def estimateOffset(itemsEstimation, offset):
     return offset
 
 
+def isBlockFeasible(blf, dims, weight, truck):
+    """
+    This function checks at once the constraints of a block of items filling a box, whose items are stable and
+    stackable by construction: the box within the container and not overlapping the placed items, and the weight of
+    the block within the limits of the container and of its subzones, spread evenly along its length.
+
+    :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+    :param dims: ndarray with the width, height and length of the box.
+    :param weight: weight of the items of the block.
+    :param truck: truck object.
+    :return: True if the constraints are satisfied, False otherwise.
+    """
+    if (blf < 0).any() or (blf + dims > np.array([truck["width"], truck["height"], truck["length"]])).any():
+        return False
+    if truck["weight"] + weight > truck["tonnage"] or truck["store"].intersectsAny(blf, dims):
+        return False
+    ids, fractions = truck["subzoneLedger"].getSplit(blf[2], blf[2] + dims[2])
+    return bool(truck["subzoneLedger"].fitsContributions(ids, fractions * weight).all())
+
+
+def loadBlocks(candidateList, truck, nDst, minDim, placedItems):
+    """
+    This function places in whole walls, from the front of the container, the items of the first destination whose
+    type has enough copies to fill a wall, checking the constraints once per wall. The walls of a destination with
+    others behind take at most the part of the floor the base assigns to it. The ADR items are left for the stages,
+    since they go to the rear of the container.
+
+    :param candidateList: list of items to be packed.
+    :param truck: truck object.
+    :param nDst: number of destinations of the cargo.
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param placedItems: list of items that have been already placed inside the container.
+    :return: dictionary with the packed items, non-packed items, current state of the truck and potential points of
+    the free space around the walls, None if no wall is placed.
+    """
+    builder = BlockBuilder(truck, getGapFor(truck))
+    if nDst > 1:
+        maxArea = generateMaxAreas(list(map(lambda x: len(list(filter(lambda y: y["dstCode"] == x, candidateList))),
+                                            range(nDst))),
+                                   list(map(lambda x: len(list(filter(lambda y: y["dstCode"] == x and y["priority"],
+                                                                      candidateList))), range(nDst))), truck, nDst)[0]
+    else:
+        maxArea = truck["width"] * truck["length"]
+    z, area, placedIds, points = 0, 0, set(), []
+    for group in groupPacketsByType(filter(lambda x: x["dstCode"] == 0 and not x["ADR"], candidateList)):
+        layout = builder.getLayout(group["items"][0])
+        if layout is None:
+            continue
+        perWall = layout["columns"] * layout["rows"]
+        startZ = z
+        for k in range(group["count"] // perWall):
+            blf, dims = builder.getWallBox(layout, z)
+            wallItems = group["items"][k * perWall:(k + 1) * perWall]
+            if area + dims[0] * dims[2] > maxArea or \
+                    not isBlockFeasible(blf, dims, sum(map(lambda x: x["weight"], wallItems)), truck):
+                break
+            for item, corner in zip(wallItems, builder.getWallCorners(layout, z)):
+                item = setItemOrientation(item, layout["or"])
+                item["mass_center"] = corner + layout["dims"] / 2
+                item = setItemSubzones(truck["subzoneLedger"], item)
+                # Every item rests on the whole top of the one below.
+                item["subzones"] = list(map(lambda x: x + [getBottomPlaneArea(item) * x[1]], item["subzones"]))
+                placedItem = PlacedItem(addWeightContributionTo(item))
+                placedItem["pp_in"] = corner
+                placedItem["pp_out"] = np.empty((0, 3))
+                placedItem["in_id"] = len(placedItems)
+                placedItems.append(placedItem)
+                placedIds.add(placedItem["id"])
+                truck = addItemToContainerIndexes(placedItem, truck)
+                truck = addItemWeightToTruckSubzones(placedItem["subzones"], truck)
+            area += dims[0] * dims[2]
+            z += dims[2] + builder.gap
+        if z > startZ:
+            points.append(builder.getPointsAround(layout, startZ, minDim))
+    if not z:
+        return None
+    # The front of the walls, with the same points as an empty container.
+    points.append(np.array([[0, 0, z], [truck["width"], 0, z]], dtype=float))
+    return {"placed": placedItems, "discard": list(filter(lambda x: x["id"] not in placedIds, candidateList)),
+            "truck": truck, "potentialPoints": np.vstack(points)}
+
+
 def loadBase(candidateList, potentialPoints, truck, nDst, minDim, placedItems, coefficients):
     """
     This function creates a solution from a list of packets and a given potential points in the base of the truck.
@@ -700,17 +996,18 @@ def loadBase(candidateList, potentialPoints, truck, nDst, minDim, placedItems, c
     :param placedItems: list of items that have been already placed inside the container.
     :return: dictionary with the packed items, non-packed items, current state of the truck and not used potential points.
     """
-    # Fill number of items per destination.
-    filteredCandidates = []
-    for d in range(nDst):
-        filteredCandidates.append(list(filter(lambda x: x["dstCode"] == d, candidateList)))
-    nItemDst = list(map(lambda x: len(x), filteredCandidates))
+    # Group the candidates by destination.
+    pool = CandidatePool(candidateList, ("weight",))
+    # Fill number of items per destination, the items already placed, as those of the blocks, count as well.
+    nItemDst = list(map(lambda x: pool.count(x) + len(list(filter(lambda y: y["dstCode"] == x, placedItems))),
+                        range(nDst)))
     # Statistics on the candidateList.
     meanDim, avgWeight, stdDev = getStatsForBase(candidateList)
     # Obtain the maximum weight of the candidateList.
-    maxWeight = getMaxWeight(candidateList)
+    maxWeight = pool.getMax("weight")
     # Count amount of filtered for each destination.
-    nFilteredDst = list(map(lambda x: len(list(filter(lambda y: y["priority"], x))), filteredCandidates))
+    nFilteredDst = list(map(lambda x: len(list(filter(lambda y: y["priority"] and y["dstCode"] == x,
+                                                      pool.getItems(x) + placedItems))), range(nDst)))
     # Create max area items of a destination can occupy within the container.
     maxAreas = generateMaxAreas(nItemDst, nFilteredDst, truck, nDst)
     nItemsEstimation = list(map(lambda x: int(maxAreas[x] / (meanDim[x] ** 2)), range(nDst)))
@@ -718,105 +1015,127 @@ def loadBase(candidateList, potentialPoints, truck, nDst, minDim, placedItems, c
     # Make sure there are neither too many packets nor very few caused by a really low std dev.
     for d in range(nDst):
         # Added filtered candidates based on estimation.
-        filteredCandidates[d] = filteredCandidates[d][:int(nItemsEstimation[d] * offset)]
-    # Initialize current areas.
+        for item in pool.getItems(d)[int(nItemsEstimation[d] * offset):]:
+            pool.remove(item["id"])
+    # Initialize current areas with the items already placed in the floor.
     currentAreas = np.zeros((1, nDst))
+    for item in filter(isInFloor, placedItems):
+        currentAreas[0][item["dstCode"]] += getBottomPlaneArea(item)
     # Group items that did not pass the filter.
-    flattenedFilteredCandidates = [item for sublist in filteredCandidates for item in sublist]
-    discardList = list(filter(lambda x: x not in flattenedFilteredCandidates, candidateList))
-    # Update list with the items that passed the filter.
-    candidateList = filteredCandidates
+    discardList = list(filter(lambda x: x["id"] not in pool, candidateList))
+    potentialPoints = list(map(lambda x: createPotentialPointStore(x, truck), potentialPoints))
     # Auxiliary list to group PP that are not important in this stage(those that are not in the floor).
     notInFloorPPByDst = list(map(lambda x: [], range(nDst)))
     # Set of PP in which no item for a destination fits.
     exhaustedInFloorPPByDst = list(map(lambda x: [], range(nDst)))
+    budget = truck.get("searchBudget")
     # Check the best item for each Potential Point in order of destination.
     for d in range(nDst):
         # Add to next destination the potential points of the previous destination.
         if d:
-            potentialPoints.append(np.vstack((potentialPoints[d - 1], np.array(sorted(exhaustedInFloorPPByDst[0], key=lambda x: x[2]))[-10:])))
+            potentialPoints.append(createPotentialPointStore(potentialPoints[d - 1].getPoints(), truck))
+            potentialPoints[d].add(np.array(sorted(exhaustedInFloorPPByDst[0], key=lambda x: x[2]))[-10:])
         # The intention is to fill the max area of the container assigned to a destination,
         # so it checks this condition for each potential point, each item and each item orientation.
         while (currentAreas[0][d] <= maxAreas[d]) and len(potentialPoints[d]):
+            # The items left when the budget of the stage is spent are not evaluated.
+            if budget is not None and budget.isStageExhausted():
+                break
             # Check if there is no item that satisfies fulfilling without exceeding max allowed area.
             if not any(
-                    list(map(lambda x: getBottomPlaneArea(x) + currentAreas[0][d] <= maxAreas[d], candidateList[d]))):
+                    list(map(lambda x: getBottomPlaneArea(x) + currentAreas[0][d] <= maxAreas[d], pool.getItems(d)))):
                 break
             # Initialization of best point as the worst, in this context the TRR of the truck. And worse fitness value.
             ppBest = [np.array([truck["width"], truck["height"], truck["length"]]), 0]
             # Get the potential point with lower z-coordinate (closest to the front of the container).
-            pp = sorted(potentialPoints[d], key=lambda x: (x[:][2], -abs(x[:][0] - truck["width"] / 2)))[0]
+            pp = potentialPoints[d].getLowest()
             # Gather in one list the current destination and the next.
             # TODO, keep in mind this alternative: getCandidatesByDestination()
-            candidatesByDst = candidateList[d]
+            candidatesByDst = pool.getItems(d)
+            if budget is not None:
+                candidatesByDst = candidatesByDst[:budget.getWindow(len(candidatesByDst))]
             # Only proceed with the search if the item is in the floor.
             if not pp[1]:
-                for i in candidatesByDst:
+                # Area, physical constraints and fitness of every candidate in every orientation at once.
+                feasibleByCandidate, fitnessByCandidate = evaluateBaseCandidatesFor(pp, candidatesByDst, currentAreas,
+                                                                                    maxAreas, minDim, truck, nDst,
+                                                                                    maxWeight, coefficients)
+                for c, i in enumerate(candidatesByDst):
                     # Pick one random orientation apart from the current.
                     orientations = i["feasibleOr"]
-                    for o in orientations:
+                    # Result of the weight distribution checks for each shape, the same in its duplicate orientations.
+                    feasibilityByShape = {}
+                    for k, o in enumerate(orientations):
                         if o != i["or"]:
                             i = changeItemOrientation(i, [o])
-                        # Try to get the best PP for an item.
-                        # [condition, item]
-                        feasibility = feasibleInFillingBase(pp, placedItems, i, currentAreas, maxAreas, minDim, truck)
-                        if feasibility[0]:
-                            ppWithFitness = fitnessForBase(pp, feasibility[1], truck["length"], nDst, placedItems,
-                                                           maxWeight, coefficients)
-                            # Can use the same even thought the concept is different, in all cases the pp is going to be
-                            # the same but with diff fitness functions so the highest will save the item.
-                            if isBetterPP(ppWithFitness, ppBest, truck["width"], 1):
-                                ppBest = ppWithFitness
-                                feasibleItem = feasibility[1]
+                        # Only an orientation that may beat the current best needs the weight distribution checks.
+                        if feasibleByCandidate[c][k] and fitnessByCandidate[c][k] >= ppBest[1]:
+                            i = setItemMassCenter(i, pp, truck["width"], minDim)
+                            shape = (i["width"], i["height"], i["length"])
+                            if shape not in feasibilityByShape:
+                                # [condition, item]
+                                feasibilityByShape[shape] = stabilityConstrains(placedItems, i, truck, 0)
+                            feasibility = feasibilityByShape[shape]
+                            # The placement checked in another orientation is recorded again in the current one.
+                            if feasibility[0] and feasibility[1]["or"] != o:
+                                feasibility = [1, PlacementRecord(i, list(map(lambda x: list(x),
+                                                                              feasibility[1]["subzones"])))]
+                            if feasibility[0]:
+                                ppWithFitness = [pp, fitnessByCandidate[c][k]]
+                                # Can use the same even thought the concept is different, in all cases the pp is going
+                                # to be the same but with diff fitness functions so the highest will save the item.
+                                if isBetterPP(ppWithFitness, ppBest, truck["width"], 1):
+                                    ppBest = ppWithFitness
+                                    feasibleItem = feasibility[1]
+                    # Leave the item in the potential point as if every orientation had been checked one by one.
+                    setItemMassCenter(i, pp, truck["width"], minDim)
                     # This condition is only important for the first two items.
                     if ppBest[1] == 1:
                         break
                 # If the best is different from the worst there is a PP to insert the item.
                 if ppBest[1]:
+                    # The placed item is kept in the item format, with the geometry of its box frozen.
+                    feasibleItem = PlacedItem(feasibleItem.toDict())
                     currentAreas[0][feasibleItem["dstCode"]] = currentAreas[0][
                                                                    feasibleItem["dstCode"]] + getBottomPlaneArea(
                         feasibleItem)
                     # Add pp in which the object is inserted.
                     feasibleItem["pp_in"] = ppBest[0]
                     # Remove item from candidate list.
-                    candidateList[feasibleItem["dstCode"]] = list(
-                        filter(lambda x: feasibleItem["id"] != x["id"], candidateList[feasibleItem["dstCode"]]))
+                    pool.remove(feasibleItem["id"])
                     # Remove pp_best from potentialPoints list.
-                    potentialPoints[d] = potentialPoints[d][~(potentialPoints[d] == ppBest[0]).all(axis=1)]
+                    potentialPoints[d].remove(ppBest[0])
                     # Generate new PPs to add to item and potentialPoints.
-                    newPPs = generateNewPPs(feasibleItem, placedItems, truck["height"], truck["width"], minDim, 0)
+                    newPPs = generateNewPPs(feasibleItem, placedItems, truck["height"], truck["width"], minDim, 0,
+                                            truck.get("heightMap"), truck.get("planeIndex"))
                     feasibleItem["pp_out"] = newPPs
-                    # In case there are no potential points left, the operation is not a vertical stack.
-                    if potentialPoints[d].shape[0]:
-                        # Need to keep numpy matrix structure in each dst of PPs to make the erasing operation.
-                        potentialPoints[d] = np.vstack((potentialPoints[d], newPPs)) if len(newPPs) else \
-                            potentialPoints[d]
-                    else:
-                        potentialPoints[d] = newPPs
+                    potentialPoints[d].add(newPPs)
                     # Add insertion order to item.
                     feasibleItem["in_id"] = len(placedItems)
                     # Add item to placedItems.
                     placedItems.append(feasibleItem)
+                    truck = addItemToContainerIndexes(feasibleItem, truck)
                     # Update truck weight status
                     truck = addItemWeightToTruckSubzones(feasibleItem["subzones"], truck)
                 else:
                     # There is no item and item orientation for this potential point.
                     exhaustedInFloorPPByDst[d].append(pp)
                     # Delete it from the list of potential points.
-                    potentialPoints[d] = potentialPoints[d][~(potentialPoints[d] == pp).all(axis=1)]
+                    potentialPoints[d].remove(pp)
             else:
                 # Add potential point that is not on the floor.
                 notInFloorPPByDst[d].append(pp)
-                potentialPoints[d] = potentialPoints[d][~(potentialPoints[d] == pp).all(axis=1)]
+                potentialPoints[d].remove(pp)
                 continue
     # Update the list with the items that have not been packed.
-    discardList = discardList + [item for sublist in candidateList for item in sublist]
-    # Discards an unfair base solution.
-    if (nDst > 1) and not mean_absolute_percentage_error([maxAreas], currentAreas) < 0.15:
+    discardList = discardList + [item for d in range(nDst) for item in pool.getItems(d)]
+    # Discards an unfair base solution, unless the budget has cut it short or narrowed its search.
+    if (nDst > 1) and not mean_absolute_percentage_error([maxAreas], currentAreas) < 0.15 and \
+            (budget is None or not (budget.exhausted or budget.narrowed)):
         return None
-    # Keep the potential points that are not in the floor.
+    # Keep the potential points that are not in the floor, a destination may have none if the budget has been spent.
     return {"placed": placedItems, "discard": discardList,
-            "truck": truck, "potentialPoints": list(map(lambda x: np.asarray(x), notInFloorPPByDst))}
+            "truck": truck, "potentialPoints": list(map(lambda x: np.asarray(x).reshape(-1, 3), notInFloorPPByDst))}
 
 
 def getMixedPotentialPoints(potentialPoints):
@@ -830,7 +1149,8 @@ def getMixedPotentialPoints(potentialPoints):
     """
     newPPs = []
     sortedPPByZ = list(
-        map(lambda y: np.asarray(y), list(map(lambda x: sorted(x, key=lambda y: y[:][2]), potentialPoints))))
+        map(lambda y: np.asarray(y).reshape(-1, 3),
+            list(map(lambda x: sorted(x, key=lambda y: y[:][2]), potentialPoints))))
     # One destination case.
     if len(potentialPoints) == 1:
         return sortedPPByZ
@@ -862,7 +1182,110 @@ def getMixedPotentialPoints(potentialPoints):
     return newPPs
 
 
-def load(candidateList, potentialPoints, truck, retry, stage, nDst, minDim, placedItems, coefficients):
+def getDominatedPPsMask(potentialPoints, leftward, freeSpace):
+    """
+    This function finds the potential points whose free space is reachable from another one, that is, a point at the
+    same height and depth, growing in the same direction, whose free segment in width contains the one of the point
+    and whose free height and length are not smaller. Among points with the same free space the first one is kept.
+
+    :param potentialPoints: ndarray of cartesian points, one per row.
+    :param leftward: boolean ndarray, True for the points whose items grow to the left.
+    :param freeSpace: ndarray with the free width, height and length of each point, one per row.
+    :return: boolean ndarray, True for the dominated points.
+    """
+    tolerance = 0.000001
+    starts = np.where(leftward, potentialPoints[:, 0] - freeSpace[:, 0], potentialPoints[:, 0])
+    ends = starts + freeSpace[:, 0]
+    # Row a, column b: b reaches the free space of a.
+    dominating = (np.abs(potentialPoints[:, None, 1:] - potentialPoints[None, :, 1:]) <= tolerance).all(axis=2) \
+                 & (leftward[:, None] == leftward[None, :]) \
+                 & (starts[None, :] <= starts[:, None] + tolerance) & (ends[:, None] <= ends[None, :] + tolerance) \
+                 & (freeSpace[:, None, 1:] <= freeSpace[None, :, 1:] + tolerance).all(axis=2)
+    equal = dominating & dominating.T
+    indexes = np.arange(len(potentialPoints))
+    return (dominating & (~equal | (indexes[None, :] < indexes[:, None]))).any(axis=1)
+
+
+def getUsefulPPsMask(potentialPoints, truck, minDim, remainingMinDim, dominance=True):
+    """
+    This function finds the potential points in which some of the remaining items could still be placed, those whose
+    free space to the walls and to the placed items is not smaller than the smallest dimension of the remaining
+    items in any axis, and that are not dominated by another point.
+
+    :param potentialPoints: ndarray of cartesian points, one per row.
+    :param truck: truck object.
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param remainingMinDim: minimum size in any dimension of the items not placed yet.
+    :param dominance: True to also discard the dominated points.
+    :return: boolean ndarray, True for the useful points.
+    """
+    if not len(potentialPoints):
+        return np.ones(0, dtype=bool)
+    # Same shift to the left as setItemMassCenter next to the right wall.
+    leftward = (truck["width"] - minDim <= potentialPoints[:, 0]) & (potentialPoints[:, 0] <= truck["width"])
+    freeSpace = truck["store"].getFreeSpaceFor(potentialPoints,
+                                                     [truck["width"], truck["height"], truck["length"]], leftward)
+    useful = (freeSpace >= remainingMinDim - 0.000001).all(axis=1)
+    if dominance and useful.any():
+        useful[useful] = ~getDominatedPPsMask(potentialPoints[useful], leftward[useful], freeSpace[useful])
+    return useful
+
+
+def prunePotentialPoints(potentialPoints, truck, minDim, remainingMinDim, dominance=True):
+    """
+    This function removes from the potential points of every destination those that are not useful anymore.
+
+    :param potentialPoints: list with the store of potential points of each destination.
+    :param truck: truck object.
+    :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
+    :param remainingMinDim: minimum size in any dimension of the items not placed yet.
+    :param dominance: True to also remove the dominated points.
+    :return: list of stores of potential points.
+    """
+    for store in potentialPoints:
+        points = store.getPoints()
+        store.remove(points[~getUsefulPPsMask(points, truck, minDim, remainingMinDim, dominance)])
+    return potentialPoints
+
+
+def checkCoordinateUnit(unit):
+    """
+    This function checks that a coordinate unit divides a metre and is not above a millimetre. The potential points
+    are rounded down to its grid, so the gap of 0.0015 metres between items stays above the 0.0001 metres tolerance
+    of the geometric checks.
+
+    :param unit: size in metres of the integer grid, 0 to use the metres.
+    """
+    if unit and (abs(1 / unit - round(1 / unit)) > 0.000001 or unit > 0.001):
+        raise ValueError("The coordinate unit must divide a metre and be at most 0.001 metres: " + str(unit))
+
+
+def getPlacementEngine(name, potentialPoints, truck, stage, nDst, minDim, placedItems):
+    """
+    This function creates the placement engine of a loading stage.
+
+    :param name: name of the engine, options: ["corner", "ems"].
+    :param potentialPoints: list with an ndarray of potential points for each destination, used by the corner engine.
+    :param truck: truck object.
+    :param stage: packing stage of the algorithm.
+    :param nDst: number of destinations of the cargo.
+    :param minDim: minimum size in any dimension (width, height, length) of any item to be placed.
+    :param placedItems: list of items that have been already placed inside the container.
+    :return: placement engine object.
+    """
+    if name == "ems":
+        return MaximalSpaceEngine(truck, placedItems, nDst, stage, minDim, getGapFor(truck))
+    if name != "corner":
+        raise ValueError("Unknown placement engine: " + str(name))
+    # TODO, try sorting from the front to the rear the potential points in stage 1.
+    potentialPoints = potentialPoints if stage == 1 else getMixedPotentialPoints(potentialPoints)
+    return CornerPointEngine(potentialPoints, lambda x: createPotentialPointStore(x, truck),
+                             lambda x: generateNewPPs(x, placedItems, truck["height"], truck["width"], minDim, stage,
+                                                      truck.get("heightMap"), truck.get("planeIndex")))
+
+
+def load(candidateList, potentialPoints, truck, retry, stage, nDst, minDim, placedItems, coefficients,
+         newPPBuffer=None, bestFirstSearch=0, prunePPs=0, placementEngine="corner", groupIdenticalItems=0):
     """
     This function creates a solution from a list of packets and a given potential points above the first layer
     base of items of the truck.
@@ -875,74 +1298,178 @@ def load(candidateList, potentialPoints, truck, retry, stage, nDst, minDim, plac
     :param nDst: number of destinations of the cargo.
     :param minDim: minimum size in any dimension (width, height, length) of any item of the cargo.
     :param placedItems: list of items that have been already placed inside the container.
+    :param newPPBuffer: buffer of the potential points of the last stages, kept up to date with the placed items if given.
+    :param bestFirstSearch: 1 to search the potential points in order of their fitness upper bounds, 0 to check them all.
+    :param prunePPs: 1 to remove the corner potential points in which no remaining item fits and the dominated ones.
+    :param placementEngine: name of the engine giving the insertion points, options: ["corner", "ems"].
+    :param groupIdenticalItems: 1 to try each copy of a run of identical items first in the points created by the
+    previous copy, evaluating all the points only if none of them is feasible.
     :return: dictionary with the packed items, non-packed items, current state of the truck and not used potential points.
     """
     discardedPackets = []
-    # TODO, try sorting from the front to the rear the potential points in stage 1.
-    potentialPoints = potentialPoints if stage == 1 else getMixedPotentialPoints(potentialPoints)
-    for i in candidateList:
-        # Update average list excluding those items which have been already placed.
-        notPlacedMaxWeight = getMaxWeight(candidateList)
-        # Using the method as a retryList fill.
-        if retry:
-            i = reorient(i)
-        # Initialization of best point as the worst, in this context the TRR of the truck. And worse fitness value.
-        ppBest = [np.array([[truck["width"], truck["height"], truck["length"]]]), 0]
-        # Try to get the best PP for an item.
-        for pp in potentialPoints[i["dstCode"]]:
-            # [condition, item]
-            feasibility = isFeasible(pp, placedItems, i, minDim, truck, stage)
-            if feasibility[0]:
-                ppWithFitness = fitnessFor(pp, feasibility[1], placedItems, notPlacedMaxWeight, truck["height"],
-                                           truck["length"], stage, nDst, coefficients)
-                if isBetterPP(ppWithFitness, ppBest, truck["width"], 0):
-                    ppBest = ppWithFitness
-                    feasibleItem = feasibility[1]
-        # If the best is different from the worst there is a PP to insert the item.
-        if ppBest[1] != 0:
-            # Add pp in which the object is inserted.
-            feasibleItem["pp_in"] = ppBest[0]
-            # Remove pp_best from potentialPoints list.
-            potentialPoints[i["dstCode"]] = potentialPoints[i["dstCode"]][
-                ~(potentialPoints[i["dstCode"]] == ppBest[0]).all(axis=1)]
-            # Generate new PPs to add to item and potentialPoints.
-            newPPs = generateNewPPs(feasibleItem, placedItems, truck["height"], truck["width"], minDim, stage)
-            feasibleItem["pp_out"] = newPPs
-            # Append new potential points to general potential points
-            potentialPoints[i["dstCode"]] = np.vstack((potentialPoints[i["dstCode"]], newPPs)) if len(newPPs) else \
-                potentialPoints[i["dstCode"]]
-            potentialPoints = list(map(lambda x: np.unique(x, axis=0), projectPPOverlapped(feasibleItem, potentialPoints)))
-            # Add insertion order to item.
-            feasibleItem["in_id"] = len(placedItems)
-            # Add item to placedItems.
-            placedItems.append(feasibleItem)
-            # Update truck weight status
-            truck = addItemWeightToTruckSubzones(feasibleItem["subzones"], truck)
-        else:
-            discardedPackets.append(i)
+    budget = truck.get("searchBudget")
+    engine = getPlacementEngine(placementEngine, potentialPoints, truck, stage, nDst, minDim, placedItems)
+    pool = CandidatePool(candidateList, ("weight",))
+    # The fitness is normalized by the maximum weight of the items of the stage.
+    maxWeight = getMaxWeight(candidateList) if candidateList else 0
+    # The empty maximal spaces are already free of the spaces too small for the items.
+    remainingMinDim = getMinDim(candidateList) if prunePPs and candidateList and placementEngine == "corner" else None
+    if remainingMinDim is not None:
+        engine.stores = prunePotentialPoints(engine.stores, truck, minDim, remainingMinDim)
+    for group in groupIdenticalPackets(candidateList):
+        # Dimensions of the copies of the group without any point since the last insertion and points created by the
+        # last copy placed.
+        failedDims, chain = set(), None
+        for i in group["items"]:
+            # Using the method as a retryList fill.
+            if retry:
+                i = reorient(i)
+            # Nothing has changed since an identical copy in the same orientation found no point, or the budget of the
+            # stage has been spent.
+            if (i["width"], i["height"], i["length"]) in failedDims or \
+                    (budget is not None and budget.isStageExhausted()):
+                discardedPackets.append(i)
+                continue
+            # Initialization of best point as the worst, in this context the TRR of the truck. And worse fitness value.
+            ppBest = [np.array([[truck["width"], truck["height"], truck["length"]]]), 0]
+            # Try to get the best PP for an item, first among the points created by the previous copy.
+            points = engine.getPointsFor(i)
+            if budget is not None:
+                points = budget.getWindowOf(points)
+            best = None
+            if chain is not None:
+                inChain = (points[:, None, :] == chain[None, :, :]).all(axis=2).any(axis=1)
+                if inChain.any():
+                    best = getBestPPFor(i, points[inChain], placedItems, minDim, truck, stage, maxWeight,
+                                        nDst, coefficients, bestFirstSearch)
+            if best is None:
+                best = getBestPPFor(i, points, placedItems, minDim, truck, stage, maxWeight, nDst,
+                                    coefficients, bestFirstSearch)
+            if best is not None:
+                ppBest, feasibleItem = best
+            # If the best is different from the worst there is a PP to insert the item.
+            if ppBest[1] != 0:
+                # The placed item is kept in the item format, with the geometry of its box frozen.
+                feasibleItem = PlacedItem(feasibleItem.toDict())
+                # Add pp in which the object is inserted.
+                feasibleItem["pp_in"] = ppBest[0]
+                # The engine drops the point used and creates the new ones.
+                newPPs = engine.place(feasibleItem, ppBest[0])
+                feasibleItem["pp_out"] = newPPs
+                # Add insertion order to item.
+                feasibleItem["in_id"] = len(placedItems)
+                # Add item to placedItems.
+                placedItems.append(feasibleItem)
+                pool.remove(i["id"])
+                truck = addItemToContainerIndexes(feasibleItem, truck)
+                if newPPBuffer is not None:
+                    newPPBuffer = addItemToNewPPBuffer(feasibleItem, placedItems, truck, newPPBuffer)
+                if remainingMinDim is not None and len(pool):
+                    # The new points are checked once the item is an obstacle, all of them if the minimum has grown.
+                    itemMinDim = min(feasibleItem["width"], feasibleItem["height"], feasibleItem["length"])
+                    poolMinDim = getMinDim(pool.getItems()) if itemMinDim <= remainingMinDim else remainingMinDim
+                    if poolMinDim > remainingMinDim:
+                        remainingMinDim = poolMinDim
+                        engine.stores = prunePotentialPoints(engine.stores, truck, minDim, remainingMinDim)
+                    else:
+                        engine.stores[i["dstCode"]].remove(
+                            newPPs[~getUsefulPPsMask(newPPs, truck, minDim, remainingMinDim, False)])
+                # Update truck weight status
+                truck = addItemWeightToTruckSubzones(feasibleItem["subzones"], truck)
+                failedDims, chain = set(), newPPs if groupIdenticalItems else None
+            else:
+                discardedPackets.append(i)
+                failedDims.add((i["width"], i["height"], i["length"]))
     return {"placed": placedItems, "discard": discardedPackets,
-            "truck": truck, "potentialPoints": potentialPoints}
+            "truck": truck, "potentialPoints": engine.getPointsByDst()}
+
+
+def getNewPPFor(item, placedItems, heightMap=None, planeIndex=None, grid=None):
+    """
+    This function creates the potential point of the last stages of a placed item, its BRR, projected onto the
+    cargo underneath if it is not supported.
 
+    :param item: placed item object.
+    :param placedItems: list of items that have been already placed inside the container.
+    :param heightMap: height map of the cargo, when given the projections are taken from it.
+    :param planeIndex: index of the placed items by top plane height, used to find the items underneath if given.
+    :param grid: spatial grid of the container, used to find the items under the point if given.
+    :return: tuple with the point before and after the projection, None if the item does not create it.
+    """
+    if isInFloor(item):
+        return None
+    BRR = getBRR(item) + np.array([0, 0, 0.0015])
+    if any(list(map(lambda x: all(BRR == x), item["pp_out"]))):
+        return None
+    # Reduce the scope of items to those sharing their top y-axis Plane with bottom y-axis Plane of the new item.
+    sharePlaneItems = getSharePlaneItems(item, placedItems, 0.0016, planeIndex)
+    isBRRinPlane = any(list(map(lambda x: pointInPlane(BRR, getBLF(x), getBRR(x)), sharePlaneItems)))
+    if not isBRRinPlane:
+        return BRR, getNearestProjectionPointFor(BRR, placedItems, heightMap, grid)
+    return BRR, BRR
 
-def createNewPPs(placedItems, potentialPoints):
+
+def addItemToNewPPBuffer(item, placedItems, truck, buffer):
+    """
+    This function creates the potential point of the last stages of a placed item and checks again those of the
+    items it may support.
+
+    :param item: placed item object, the last of the placed items.
+    :param placedItems: list of items that have been already placed inside the container.
+    :param truck: truck object.
+    :param buffer: buffer of potential points of the last stages.
+    :return: modified buffer.
+    """
+    heightMap, planeIndex, grid = truck.get("heightMap"), truck.get("planeIndex"), truck.get("grid")
+    if heightMap is not None:
+        # The height map only keeps the highest surface, so the item may change the projection of the points below it.
+        affected = buffer.getAffected(getBLF(item), getTRR(item), 0.0016, heightMap.resolution + 0.001, True)
+    else:
+        affected = buffer.getAffected(getBLF(item), getTRR(item), 0.0016, 0.001)
+    for index in affected + [item["in_id"]]:
+        newPP = getNewPPFor(placedItems[index], placedItems, heightMap, planeIndex, grid)
+        if newPP is not None:
+            buffer.add(index, placedItems[index]["dstCode"], *newPP)
+    return buffer
+
+
+def addPlacedItemsToNewPPBuffer(placedItems, truck, buffer):
+    """
+    This function creates the potential points of the last stages of the items placed before the buffer, as those of
+    the walls, from the cargo already placed.
+
+    :param placedItems: list of items that have been already placed inside the container.
+    :param truck: truck object.
+    :param buffer: buffer of potential points of the last stages.
+    :return: modified buffer.
+    """
+    heightMap, planeIndex, grid = truck.get("heightMap"), truck.get("planeIndex"), truck.get("grid")
+    for item in placedItems:
+        newPP = getNewPPFor(item, placedItems, heightMap, planeIndex, grid)
+        if newPP is not None:
+            buffer.add(item["in_id"], item["dstCode"], *newPP)
+    return buffer
+
+
+def createNewPPs(placedItems, potentialPoints, heightMap=None, planeIndex=None, buffer=None):
     """
     This function creates new potential point, BRR in last stages.
 
     :param placedItems: set of placed items that 
     :param potentialPoints: set of potential points from later phases.
+    :param heightMap: height map of the cargo, when given the projections are taken from it.
+    :param planeIndex: index of the placed items by top plane height, used to find the items underneath if given.
+    :param buffer: buffer with the points of every placed item, when given they are taken from it.
     :return: set of potential points with a projection in those that were overlapped.
     """
+    if buffer is not None:
+        for dstCode, points in buffer.getPointsByDst().items():
+            potentialPoints[dstCode] = np.vstack((potentialPoints[dstCode], points))
+        return potentialPoints
     for i in placedItems:
-        if not isInFloor(i):
-            BRR = getBRR(i) + np.array([0, 0, 0.0015])
-            if not any(list(map(lambda x: all(BRR == x), i["pp_out"]))):
-                # Reduce the scope of items to those sharing their top y-axis Plane with bottom y-axis Plane of the new item.
-                sharePlaneItems = list(
-                    filter(lambda x: 0 <= abs(getBottomPlaneHeight(i) - getTopPlaneHeight(x)) <= 0.0016, placedItems))
-                isBRRinPlane = any(list(map(lambda x: pointInPlane(BRR, getBLF(x), getBRR(x)), sharePlaneItems)))
-                if not isBRRinPlane:
-                    BRR = getNearestProjectionPointFor(BRR, placedItems)
-                potentialPoints[i["dstCode"]] = np.vstack((potentialPoints[i["dstCode"]], BRR))
+        newPP = getNewPPFor(i, placedItems, heightMap, planeIndex)
+        if newPP is not None:
+            potentialPoints[i["dstCode"]] = np.vstack((potentialPoints[i["dstCode"]], newPP[1]))
     return potentialPoints
 
 
@@ -956,21 +1483,80 @@ def checkSubgroupingCondition(packets):
     return len(set(map(lambda x: x["subgroupId"], packets))) < len(packets)
 
 
-def main_cp(truck, candidateList, nDst, coefficients, subgroupingEnabled=1):
+def getSolution(loaded, consolidator=None):
+    """
+    This function builds the solution from the outcome of the last stage.
+
+    :param loaded: dictionary with the packed items, non-packed items, current state of the truck and not used
+    potential points.
+    :param consolidator: consolidator of the small items of the cargo, if given its columns are expanded back into
+    their items.
+    :return: dictionary with the packed items, non-packed items, current state of the truck, not used potential points,
+    the statistics of the constraints by stage and whether the budget has been exhausted.
+    """
+    if consolidator is not None:
+        loaded["placed"] = consolidator.expandPlaced(loaded["placed"])
+        loaded["discard"] = consolidator.expandDiscarded(loaded["discard"])
+    loaded["constraintStats"] = loaded["truck"]["constraintPipeline"].getStats()
+    loaded["budgetExhausted"] = "searchBudget" in loaded["truck"] and loaded["truck"]["searchBudget"].exhausted
+    loaded["truck"] = cleanContainerIndexes(loaded["truck"])
+    return loaded
+
+
+def main_cp(truck, candidateList, nDst, coefficients, subgroupingEnabled=1, heightMapResolution=0, bestFirstSearch=0,
+            prunePPs=0, placementEngine="corner", coordinateUnit=0, groupIdenticalItems=0, blockBuilding=0,
+            consolidationSize=0, timeBudget=0, evaluationBudget=0):
     """
     This function is the main part of the core of the solution builder.
 
     :param subgroupingEnabled: 0 to force omitting subgrouping condition.
+    :param heightMapResolution: cell size in metres of the height map used for stability and projections,
+    0 to use the exact geometry.
+    :param bestFirstSearch: 1 to search the potential points of the loading stages in order of their fitness upper
+    bounds, 0 to check all of them. Both give the same solution.
+    :param prunePPs: 1 to remove in the loading stages the potential points in which none of the remaining items fits
+    and those dominated by another point, which may change the solution.
+    :param placementEngine: engine giving the insertion points of the loading stages, "corner" for the potential
+    points of the corners of the placed items or "ems" for the corners of the empty maximal spaces of the container.
+    :param coordinateUnit: size in metres of an integer grid, which must divide a metre and be at most 0.001, in which
+    the potential points are kept and the boxes of the placed items are compared, 0 to use the metres. The item
+    dimensions are expected to be multiples of it.
+    :param groupIdenticalItems: 1 to place the copies of a run of identical items of the loading stages first in the
+    points created by the previous copy, which may change the solution.
+    :param blockBuilding: 1 to place first, in whole walls from the front of the container, the items of the first
+    destination whose type has enough copies to fill a wall, which may change the solution.
+    :param consolidationSize: largest dimension in metres of the small items stacked in columns with the same base,
+    handled as single items and expanded back into their items in the solution, 0 to not consolidate them. It may
+    change the solution.
+    :param timeBudget: wall-clock time in seconds the stages can spend, 0 for no limit. The search is narrowed as the
+    end of the part of each stage approaches and the items left when it is spent are discarded.
+    :param evaluationBudget: number of feasibility evaluations the stages can spend, 0 for no limit, spent as the time.
     :param truck: truck object.
     :param candidateList: list of objects representing the cargo.
     :param nDst: number of destinations in the cargo.
-    :return: dictionary with the packed items, non-packed items, current state of the truck and not used potential points.
+    :return: dictionary with the packed items, non-packed items, current state of the truck, not used potential points,
+    the statistics of the constraints by stage and whether the budget has been exhausted.
     """
     # Map the coefficients.
     coefficientsResorting = coefficients[0:2]
     coefficientsBase = coefficients[2:5]
     coefficientsLoading = coefficients[5:]
 
+    checkCoordinateUnit(coordinateUnit)
+    # The overlapping checks rely on the search structures of the container.
+    if "store" not in truck or truck.get("coordinateUnit", 0) != coordinateUnit:
+        truck = setContainerIndexes(truck, unit=coordinateUnit)
+    if "subzoneLedger" not in truck:
+        truck = setContainerSubzoneLedger(truck)
+    if heightMapResolution:
+        truck = setContainerHeightMap(truck, heightMapResolution)
+    # The statistics of the constraints are gathered for the whole packing.
+    truck["constraintPipeline"] = ConstraintPipeline(LOAD_CONSTRAINTS)
+    # The budget is spent from the first stage.
+    if timeBudget or evaluationBudget:
+        truck["searchBudget"] = SearchBudget(timeBudget, evaluationBudget)
+    else:
+        truck.pop("searchBudget", None)
     # Fetch the new potential points from the truck.
     potentialPoints = truck["pp"]
     # Add these potential points to the first batch.
@@ -979,25 +1565,68 @@ def main_cp(truck, candidateList, nDst, coefficients, subgroupingEnabled=1):
 
     # Determine if there is relevant subgrouping conditions
     subgrouping = checkSubgroupingCondition(candidateList) if subgroupingEnabled else 0
+    # The small items are packed as columns, with fewer candidates to be evaluated.
+    consolidator = ColumnConsolidator(consolidationSize, truck["height"] / 2, getGapFor(truck)) \
+        if consolidationSize else None
+    if consolidator is not None:
+        candidateList = consolidator.consolidate(candidateList)
     stage = 0
+    # The walls of identical items are placed before the base, which goes on from the points around them.
+    loadedBlocks = loadBlocks(candidateList, truck, nDst, minDim, []) if blockBuilding else None
+    if loadedBlocks is not None:
+        candidateList, potentialPointsByDst = loadedBlocks["discard"], [loadedBlocks["potentialPoints"]]
+        if not candidateList:
+            loadedBlocks["potentialPoints"] = [loadedBlocks["potentialPoints"]] + list(
+                map(lambda x: np.empty((0, 3)), range(nDst - 1)))
+            return getSolution(loadedBlocks, consolidator)
     # startTime0 = time.time()
-    loadedBase = loadBase(candidateList, potentialPointsByDst, truck, nDst, minDim, [], coefficientsBase)
+    nBlockItems = 0 if loadedBlocks is None else len(loadedBlocks["placed"])
+    loadedBase = loadBase(candidateList, potentialPointsByDst, truck, nDst, minDim,
+                          [] if loadedBlocks is None else loadedBlocks["placed"], coefficientsBase)
     # ----- DEBUG-INFO ------
     # print("Time stage " + str(time.time() - startTime0))
     #    print("Number of items packed after stage" + len(fillingBase["placed"]))
     #    startTime1 = time.time()
     # ----- DEBUG-INFO ------
     if loadedBase is None:
+        cleanContainerIndexes(truck)
         return None
 
+    if loadedBlocks is not None:
+        # The base only keeps the points out of the floor, those in front of and beside the walls it did not use are
+        # left for the next stage. The points are compared as the base kept them, in the nodes of the coordinate unit.
+        blockPoints = createPotentialPointStore(loadedBlocks["potentialPoints"], truck).getPoints()
+        usedPoints = np.asarray(list(map(lambda x: x["pp_in"], loadedBase["placed"][nBlockItems:]))).reshape(-1, 3)
+        isUsed = (blockPoints[:, None, :] == usedPoints[None, :, :]).all(axis=2).any(axis=1)
+        loadedBase["potentialPoints"][0] = np.vstack((loadedBase["potentialPoints"][0].reshape(-1, 3),
+                                                      blockPoints[~isUsed]))
+    # Every item may have been placed, as in a cargo of small items.
+    if not loadedBase["discard"]:
+        return getSolution(loadedBase, consolidator)
+
     stage = stage + 1
+    if "searchBudget" in truck:
+        truck["searchBudget"].startStage(stage)
+    # The potential points of the last stage are created while the items of this one are placed.
+    newPPBuffer = NewPPBuffer() if placementEngine == "corner" else None
+    # The items of the walls were placed before the buffer existed.
+    if newPPBuffer is not None and loadedBlocks is not None:
+        newPPBuffer = addPlacedItemsToNewPPBuffer(loadedBase["placed"], loadedBase["truck"], newPPBuffer)
     loadedS1 = load(
         reSortingPhase(loadedBase["discard"], loadedBase["placed"], subgrouping, nDst, coefficientsResorting),
         list(map(lambda x: np.unique(x, axis=0), loadedBase["potentialPoints"])), loadedBase["truck"], 0,
         stage,
-        nDst, getMinDim(loadedBase["discard"]), loadedBase["placed"], coefficientsLoading)
-    newPPs = createNewPPs(loadedS1["placed"], loadedS1["potentialPoints"])
+        nDst, getMinDim(loadedBase["discard"]), loadedBase["placed"], coefficientsLoading, newPPBuffer,
+        bestFirstSearch, prunePPs, placementEngine, groupIdenticalItems)
+    if not loadedS1["discard"]:
+        return getSolution(loadedS1, consolidator)
+    # The empty maximal spaces are computed again from the placed items, they do not need new points.
+    newPPs = loadedS1["potentialPoints"] if newPPBuffer is None else \
+        createNewPPs(loadedS1["placed"], loadedS1["potentialPoints"], loadedS1["truck"].get("heightMap"),
+                     loadedS1["truck"].get("planeIndex"), newPPBuffer)
     stage = stage + 1
+    if "searchBudget" in truck:
+        truck["searchBudget"].startStage(stage)
 
     # ----- DEBUG-INFO ------
     #    print("Time stage " + str(time.time() - startTime1))
@@ -1009,10 +1638,11 @@ def main_cp(truck, candidateList, nDst, coefficients, subgroupingEnabled=1):
         reSortingPhase(loadedS1["discard"], loadedS1["placed"], subgrouping, nDst, coefficientsResorting),
         list(map(lambda x: np.unique(x, axis=0), newPPs)),
         loadedS1["truck"], 1, stage, nDst,
-        getMinDim(loadedS1["discard"]), loadedS1["placed"], coefficientsLoading)
+        getMinDim(loadedS1["discard"]), loadedS1["placed"], coefficientsLoading, None, bestFirstSearch, prunePPs,
+        placementEngine, groupIdenticalItems)
     # ----- DEBUG-INFO ------
     #    print("Time stage " + str(time.time() - startTime2))
     #    startTime3 = time.time()
     #    print("Number of items packed after stage" + len(filling["placed"]))
     # ----- DEBUG-INFO ------
-    return loadingRest
+    return getSolution(loadingRest, consolidator)
@@ -0,0 +1,108 @@
+"""
+This module contains the buffer of the potential points created from the placed items for the last stage.
+"""
+
+import math
+import numpy as np
+
+
+class NewPPBuffer:
+    """
+    Bottom-Right-Rear potential points of the placed items, generated and projected when the items are placed and kept
+    in insertion order. The point of an item is checked again when a later item is placed under it. The points are
+    also bucketed in a uniform grid by their position before the projection, so only the cells around a placed item
+    are visited to find them.
+    """
+
+    def __init__(self, cellSize=0.5):
+        """
+        :param cellSize: edge in metres of the cubic cells in which the points are bucketed.
+        """
+        self.cellSize = cellSize
+        # Insertion index -> (destination, point before the projection, projected point).
+        self.points = {}
+        # Cell -> set of insertion indexes of the points in it.
+        self.cells = {}
+        # Lowest and highest cells in height with any point.
+        self.lowestLayer, self.highestLayer = 0, 0
+
+    def __len__(self):
+        return len(self.points)
+
+    def getCell(self, point):
+        """
+        This function gets the cell of a point.
+
+        :param point: cartesian point.
+        :return: tuple with the cell indexes.
+        """
+        return tuple(math.floor(c / self.cellSize) for c in point)
+
+    def add(self, index, dstCode, point, projectedPoint):
+        """
+        This function stores the potential point of a placed item, replacing the previous one of the item.
+
+        :param index: insertion index of the item.
+        :param dstCode: destination of the item.
+        :param point: cartesian point before the projection.
+        :param projectedPoint: cartesian point after the projection.
+        """
+        if index in self.points:
+            cell = self.getCell(self.points[index][1])
+            self.cells[cell].discard(index)
+            if not self.cells[cell]:
+                del self.cells[cell]
+        self.points[index] = (dstCode, point, projectedPoint)
+        cell = self.getCell(point)
+        self.cells.setdefault(cell, set()).add(index)
+        self.lowestLayer = min(self.lowestLayer, cell[1])
+        self.highestLayer = max(self.highestLayer, cell[1])
+
+    def getAffected(self, blf, trr, tolerance, margin=0, below=False):
+        """
+        This function gets the items whose point could be supported or projected onto a box, that is, those points
+        above or close to its top plane and over its footprint.
+
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+        :param trr: cartesian coordinates of the Top-Right-Rear corner of the box.
+        :param tolerance: maximum distance between a top plane and a bottom plane to be in contact.
+        :param margin: extra distance in the x and z axes to be considered around the box.
+        :param below: True to also get the points below the top plane of the box.
+        :return: sorted list of insertion indexes.
+        """
+        low = self.getCell([blf[0] - margin, trr[1] - tolerance, blf[2] - margin])
+        high = self.getCell([trr[0] + margin, trr[1] - tolerance, trr[2] + margin])
+        affected = []
+        for i in range(low[0], high[0] + 1):
+            for j in range(self.lowestLayer if below else max(low[1], self.lowestLayer), self.highestLayer + 1):
+                for k in range(low[2], high[2] + 1):
+                    affected.extend(index for index in self.cells.get((i, j, k), ())
+                                    if self.isAffected(self.points[index][1], blf, trr, tolerance, margin, below))
+        return sorted(affected)
+
+    @staticmethod
+    def isAffected(point, blf, trr, tolerance, margin, below):
+        """
+        This function checks whether a point could be supported or projected onto a box.
+
+        :param point: cartesian point before the projection.
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+        :param trr: cartesian coordinates of the Top-Right-Rear corner of the box.
+        :param tolerance: maximum distance between a top plane and a bottom plane to be in contact.
+        :param margin: extra distance in the x and z axes to be considered around the box.
+        :param below: True to also consider the points below the top plane of the box.
+        :return: True if the point has to be checked again, False otherwise.
+        """
+        return (below or trr[1] - tolerance <= point[1]) \
+            and blf[0] - margin <= point[0] <= trr[0] + margin and blf[2] - margin <= point[2] <= trr[2] + margin
+
+    def getPointsByDst(self):
+        """
+        This function gets the projected points by destination.
+
+        :return: dictionary with an ndarray of the points of each destination, in insertion order.
+        """
+        pointsByDst = {}
+        for dstCode, _, projectedPoint in self.points.values():
+            pointsByDst.setdefault(dstCode, []).append(projectedPoint)
+        return dict(map(lambda x: (x[0], np.array(x[1], dtype=float).reshape(-1, 3)), pointsByDst.items()))
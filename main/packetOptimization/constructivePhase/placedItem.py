@@ -0,0 +1,82 @@
+"""
+This module contains the placed item of the constructive phase, which keeps its box geometry precomputed.
+"""
+
+import numpy as np
+
+# Keys of the item the geometry is computed from.
+GEOMETRY_KEYS = ("mass_center", "width", "height", "length")
+
+
+def getReadOnly(values):
+    """
+    This function builds an ndarray that cannot be modified, so it can be shared by every reader.
+
+    :param values: values of the array.
+    :return: read-only ndarray.
+    """
+    array = np.array(values)
+    array.flags.writeable = False
+    return array
+
+
+class BoxGeometry:
+    """
+    Corners, heights of the bottom and top planes, bottom plane area and XY, ZY, ZX planes of the box of an item,
+    computed with the same arithmetic as the geometric helpers so the values are identical.
+    """
+
+    __slots__ = ("blf", "brf", "brr", "blr", "tlf", "trf", "trr", "tlr", "bottom", "top", "area", "planes")
+
+    def __init__(self, item):
+        """
+        :param item: item object with mass center.
+        """
+        halfDims = [item["width"] / 2, item["height"] / 2, item["length"] / 2]
+        mins = item["mass_center"] - halfDims
+        maxs = item["mass_center"] + halfDims
+        self.blf = getReadOnly(mins)
+        self.brf = getReadOnly([maxs[0], mins[1], mins[2]])
+        self.brr = getReadOnly([maxs[0], mins[1], maxs[2]])
+        self.blr = getReadOnly([mins[0], mins[1], maxs[2]])
+        self.tlf = getReadOnly([mins[0], maxs[1], mins[2]])
+        self.trf = getReadOnly([maxs[0], maxs[1], mins[2]])
+        self.trr = getReadOnly(maxs)
+        self.tlr = getReadOnly([mins[0], maxs[1], maxs[2]])
+        self.bottom = item["mass_center"][1] - item["height"] / 2
+        self.top = item["mass_center"][1] + item["height"] / 2
+        self.area = item["length"] * item["width"]
+        self.planes = (getReadOnly([mins[0], mins[1], item["width"], item["height"]]),
+                       getReadOnly([mins[2], mins[1], item["length"], item["height"]]),
+                       getReadOnly([mins[2], mins[0], item["length"], item["width"]]))
+
+
+class PlacedItem(dict):
+    """
+    Item placed in the container. It is the item dictionary, with the geometry of its box frozen the first time it is
+    requested and computed again only if its mass center or dimensions are changed.
+    """
+
+    __slots__ = ("geometry",)
+
+    def __init__(self, item):
+        """
+        :param item: item object with its final placement.
+        """
+        super().__init__(item)
+        self.geometry = None
+
+    def __setitem__(self, key, value):
+        if key in GEOMETRY_KEYS:
+            self.geometry = None
+        super().__setitem__(key, value)
+
+    def getGeometry(self):
+        """
+        This function gets the geometry of the box of the item.
+
+        :return: BoxGeometry object.
+        """
+        if getattr(self, "geometry", None) is None:
+            self.geometry = BoxGeometry(self)
+        return self.geometry
@@ -0,0 +1,168 @@
+"""
+This module contains the struct-of-arrays store of the boxes of the placed items.
+"""
+
+import numpy as np
+
+
+class PlacedItemStore:
+    """
+    Store of the Bottom-Left-Front and Top-Right-Rear corners of the placed items kept in preallocated arrays,
+    one row per item in insertion order, so an intersection test against all of them is a single comparison.
+    With a coordinate unit the corners are also kept as integer numbers of units and the intersection tests are
+    done over them, so they are exact.
+    """
+
+    def __init__(self, capacity=64, unit=0):
+        """
+        :param capacity: initial number of rows of the arrays, they are doubled when full.
+        :param unit: size in metres of the unit of the integer coordinates, 0 to compare the metres.
+        """
+        self.size = 0
+        self.unit = unit
+        self.mins = np.empty((capacity, 3), dtype=float)
+        self.maxs = np.empty((capacity, 3), dtype=float)
+        self.unitMins = np.empty((capacity, 3), dtype=np.int32) if unit else None
+        self.unitMaxs = np.empty((capacity, 3), dtype=np.int32) if unit else None
+
+    def __len__(self):
+        return self.size
+
+    def grow(self):
+        """
+        This function doubles the capacity of the arrays keeping the stored rows.
+        """
+        capacity = 2 * self.mins.shape[0]
+        mins, maxs = np.empty((capacity, 3), dtype=float), np.empty((capacity, 3), dtype=float)
+        mins[:self.size], maxs[:self.size] = self.mins[:self.size], self.maxs[:self.size]
+        self.mins, self.maxs = mins, maxs
+        if self.unit:
+            mins, maxs = np.empty((capacity, 3), dtype=np.int32), np.empty((capacity, 3), dtype=np.int32)
+            mins[:self.size], maxs[:self.size] = self.unitMins[:self.size], self.unitMaxs[:self.size]
+            self.unitMins, self.unitMaxs = mins, maxs
+
+    def toUnits(self, values):
+        """
+        This function converts some coordinates in metres to the nearest integer number of units.
+
+        :param values: ndarray of coordinates in metres.
+        :return: int32 ndarray of coordinates in units.
+        """
+        return np.rint(np.asarray(values) / self.unit).astype(np.int32)
+
+    def getBoxes(self, blfs, dims, rows=None):
+        """
+        This function gets the corners of the stored boxes and of some other boxes in the coordinates of the
+        comparisons, the integer units if the store has them.
+
+        :param blfs: ndarray with the Bottom-Left-Front corners of the other boxes.
+        :param dims: ndarray with the width, height and length of the other boxes.
+        :param rows: rows of the stored boxes, all of them if None.
+        :return: tuple with the minimum and maximum corners of the stored boxes and of the other boxes.
+        """
+        rows = slice(0, self.size) if rows is None else rows
+        if not self.unit:
+            return self.mins[rows], self.maxs[rows], blfs, blfs + dims
+        return self.unitMins[rows], self.unitMaxs[rows], self.toUnits(blfs), self.toUnits(blfs + dims)
+
+    def add(self, blf, dims):
+        """
+        This function appends the box of a placed item.
+
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the item.
+        :param dims: ndarray with the width, height and length of the item.
+        :return: row of the item in the store.
+        """
+        if self.size == self.mins.shape[0]:
+            self.grow()
+        self.mins[self.size] = blf
+        self.maxs[self.size] = blf + dims
+        if self.unit:
+            self.unitMins[self.size] = self.toUnits(self.mins[self.size])
+            self.unitMaxs[self.size] = self.toUnits(self.maxs[self.size])
+        self.size += 1
+        return self.size - 1
+
+    def intersectsAny(self, blf, dims, rows=None):
+        """
+        This function checks whether a box intersects any stored box. Boxes only touching by a face, edge or
+        corner do not intersect.
+
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+        :param dims: ndarray with the width, height and length of the box.
+        :param rows: rows to be checked, all of them if None.
+        :return: True if there is an intersection, False otherwise.
+        """
+        if rows is not None and not len(rows):
+            return False
+        mins, maxs, boxMin, boxMax = self.getBoxes(blf, dims, rows)
+        return bool(((np.minimum(maxs, boxMax) - np.maximum(mins, boxMin)) > 0).all(axis=1).any())
+
+    def intersectsAnyFor(self, blfs, dims, chunkSize=250000, grid=None, gridPairs=15000):
+        """
+        This function checks for a set of boxes whether each of them intersects any stored box. The comparison is
+        done by chunks of boxes to bound the memory of the broadcast.
+
+        :param blfs: ndarray with the Bottom-Left-Front corners of the boxes, one per row.
+        :param dims: ndarray with the width, height and length of the boxes, either shared or one per row.
+        :param chunkSize: maximum number of box pairs compared at once.
+        :param grid: spatial grid with the stored boxes by row, when given only the pairs of boxes sharing a cell
+        are compared.
+        :param gridPairs: minimum number of box pairs for the grid to be used, below it comparing all of them is faster.
+        :return: boolean ndarray, True for the boxes with an intersection.
+        """
+        result = np.zeros(len(blfs), dtype=bool)
+        if not self.size or not len(blfs):
+            return result
+        dims = np.broadcast_to(dims, blfs.shape)
+        if grid is not None and len(blfs) * self.size >= gridPairs:
+            # The boxes are widened by a unit so the rounding to units cannot hide a pair.
+            boxes, rows = grid.queryPairs(blfs - self.unit, blfs + dims + self.unit)
+            for start in range(0, len(boxes), chunkSize):
+                mins, maxs, boxMins, boxMaxs = self.getBoxes(blfs[boxes[start:start + chunkSize]],
+                                                             dims[boxes[start:start + chunkSize]],
+                                                             rows[start:start + chunkSize])
+                intersects = ((np.minimum(maxs, boxMaxs) - np.maximum(mins, boxMins)) > 0).all(axis=1)
+                result[boxes[start:start + chunkSize][intersects]] = True
+            return result
+        step = max(1, chunkSize // self.size)
+        for start in range(0, len(blfs), step):
+            mins, maxs, boxMins, boxMaxs = self.getBoxes(blfs[start:start + step], dims[start:start + step])
+            result[start:start + step] = ((np.minimum(maxs[None, :, :], boxMaxs[:, None, :]) -
+                                           np.maximum(mins[None, :, :], boxMins[:, None, :])) > 0).all(axis=2).any(axis=1)
+        return result
+
+    def getFreeSpaceFor(self, points, containerDims, leftward):
+        """
+        This function gets for a set of points the free distance from each of them to the walls of the container or to
+        the nearest stored box in the directions an item placed there would grow: up, to the rear and to the right, or
+        to the left for the points whose items are shifted to the left. Only the boxes that would intersect any item
+        placed in the point are taken into account, so an item longer than a free distance in its axis cannot be
+        placed there.
+
+        :param points: ndarray of cartesian points, one per row.
+        :param containerDims: width, height and length of the container.
+        :param leftward: boolean ndarray, True for the points whose items grow to the left.
+        :return: ndarray with the free width, height and length of each point, one per row.
+        """
+        free = np.column_stack((np.where(leftward, points[:, 0], containerDims[0] - points[:, 0]),
+                                containerDims[1] - points[:, 1], containerDims[2] - points[:, 2]))
+        if not self.size or not len(points):
+            return free
+        mins, maxs = self.mins[None, :self.size], self.maxs[None, :self.size]
+        p = points[:, None, :]
+        # Boxes crossing the point in each axis, any item placed in the point overlaps them in that axis.
+        crossing = (mins < p) & (p < maxs)
+        covering = (mins <= p) & (p < maxs)
+        # Up and to the rear the boxes cover the point in the other two axes.
+        for axis, other in ((1, 2), (2, 1)):
+            blocking = crossing[:, :, 0] & covering[:, :, other] & (maxs[:, :, axis] > p[:, :, axis])
+            distances = np.where(blocking, np.maximum(mins[:, :, axis] - p[:, :, axis], 0), np.inf)
+            free[:, axis] = np.minimum(free[:, axis], distances.min(axis=1))
+        blocking = covering[:, :, 1] & covering[:, :, 2]
+        distances = np.where(leftward[:, None], np.where(blocking & (mins[:, :, 0] < p[:, :, 0]),
+                                                         np.maximum(p[:, :, 0] - maxs[:, :, 0], 0), np.inf),
+                             np.where(blocking & (maxs[:, :, 0] > p[:, :, 0]),
+                                      np.maximum(mins[:, :, 0] - p[:, :, 0], 0), np.inf))
+        free[:, 0] = np.minimum(free[:, 0], distances.min(axis=1))
+        return free
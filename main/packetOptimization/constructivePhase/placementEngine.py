@@ -0,0 +1,261 @@
+"""
+This module contains the placement engines of the loading stages, which offer the positions in which an item can be
+inserted and are updated with the placed items. Every engine has the same methods, getPointsFor, place and
+getPointsByDst, and its positions are cartesian points in which the item is inserted as in a potential point, so every
+engine goes through the same constraints and fitness.
+"""
+
+import numpy as np
+from main.packetOptimization.constructivePhase.geometryHelpers import projectPPOverlapped, getBLF, getTRR
+
+
+class CornerPointEngine:
+    """
+    Corner potential points of the placed items kept in a store per destination. The new points of an item are given
+    by a function and the points overlapped by the item are projected onto its top.
+    """
+
+    def __init__(self, potentialPoints, createStore, generatePoints):
+        """
+        :param potentialPoints: list with an ndarray of potential points for each destination.
+        :param createStore: function that receives some points and returns a PotentialPointStore with them.
+        :param generatePoints: function that receives a placed item and returns its new potential points.
+        """
+        self.stores = list(map(createStore, potentialPoints))
+        self.generatePoints = generatePoints
+
+    def getPointsFor(self, item):
+        """
+        This function gets the candidate points of an item, the potential points of its destination.
+
+        :param item: item object.
+        :return: ndarray of cartesian points, one per row.
+        """
+        return self.stores[item["dstCode"]].getPoints()
+
+    def place(self, item, point):
+        """
+        This function updates the stores with an item placed in one of their points, before it is added to the
+        placed items and to the indexes of the container.
+
+        :param item: placed item object.
+        :param point: cartesian point in which the item is inserted.
+        :return: ndarray with the new potential points created by the item.
+        """
+        self.stores[item["dstCode"]].remove(point)
+        newPPs = self.generatePoints(item)
+        self.stores[item["dstCode"]].add(newPPs)
+        self.stores = projectPPOverlapped(item, self.stores)
+        # The stores are sorted on the first insertion and kept sorted as their points change.
+        for store in self.stores:
+            store.sort()
+        return newPPs
+
+    def getPointsByDst(self):
+        """
+        This function gets the potential points not used by destination.
+
+        :return: list with an ndarray of points for each destination.
+        """
+        return list(map(lambda x: x.getPoints(), self.stores))
+
+
+class MaximalSpaceEngine:
+    """
+    Empty maximal spaces of the container, the largest free cuboids between its walls and the placed items, each
+    given by its minimum and maximum corners. The boxes of the items are carved out with a gap around them, so an
+    item inside a space does not touch the others, and the spaces contained in others or too small for any item are
+    dropped. The candidates of an item are the Bottom-Left-Front corners of the spaces it fits in, and also the
+    Bottom-Right-Front corners of those next to the right wall, in which the item is shifted to the left, anchored on
+    the floor or on the placed items under the spaces. The spaces offered to a destination are those starting within
+    the depth of its placed items and, in the last stage, of the adjacent destinations.
+    """
+
+    def __init__(self, truck, placedItems, nDst, stage, minDim, gap=0.0015, minContactArea=0.75):
+        """
+        :param truck: truck object.
+        :param placedItems: list of items that have been already placed inside the container.
+        :param nDst: number of destinations of the cargo.
+        :param stage: packing stage of the algorithm.
+        :param minDim: minimum size in any dimension (width, height, length) of any item to be placed.
+        :param gap: distance kept between the spaces and the boxes of the placed items.
+        :param minContactArea: lowest part of the bottom of an item in contact with the items under it that can be
+        stable, the candidates with less contact area are dropped. The support taken from a height map may be larger,
+        so they are kept if the truck has one.
+        """
+        self.truckWidth = truck["width"]
+        self.store = truck["store"]
+        self.unit = truck.get("coordinateUnit", 0)
+        self.stage = stage
+        self.minDim = minDim
+        self.gap = gap
+        self.minContactArea = minContactArea if truck.get("heightMap") is None else 0
+        self.spaces = np.array([[0, 0, 0, truck["width"], truck["height"], truck["length"]]], dtype=float)
+        # Destination -> [minimum, maximum] depth of its placed items.
+        self.zones = np.full((nDst, 2), np.nan)
+        for item in placedItems:
+            self.carve(item)
+
+    def __len__(self):
+        return len(self.spaces)
+
+    def carve(self, item):
+        """
+        This function removes the box of an item from the spaces, splitting those it intersects into the maximal
+        spaces around it.
+
+        :param item: placed item object.
+        :return: ndarray with the new spaces, one per row.
+        """
+        boxMin, boxMax = getBLF(item) - self.gap, getTRR(item) + self.gap
+        zone = self.zones[item["dstCode"]]
+        zone[:] = [np.fmin(zone[0], boxMin[2] + self.gap), np.fmax(zone[1], boxMax[2] - self.gap)]
+        intersected = ((np.minimum(self.spaces[:, 3:], boxMax) - np.maximum(self.spaces[:, :3], boxMin)) > 0).all(
+            axis=1)
+        if not intersected.any():
+            return np.empty((0, 6))
+        pieces = []
+        for space in self.spaces[intersected]:
+            for axis in range(3):
+                if boxMin[axis] > space[axis]:
+                    piece = space.copy()
+                    piece[3 + axis] = boxMin[axis]
+                    pieces.append(piece)
+                if boxMax[axis] < space[3 + axis]:
+                    piece = space.copy()
+                    piece[axis] = boxMax[axis]
+                    pieces.append(piece)
+        self.spaces = self.spaces[~intersected]
+        pieces = np.array(pieces).reshape(-1, 6)
+        pieces = pieces[((pieces[:, 3:] - pieces[:, :3]) >= self.minDim).all(axis=1)]
+        # The untouched spaces were maximal, only the new ones can be contained in another space.
+        pieces = pieces[~self.getContainedMask(pieces, np.vstack((self.spaces, pieces)), len(self.spaces))]
+        self.spaces = np.vstack((self.spaces, pieces))
+        return pieces
+
+    @staticmethod
+    def getContainedMask(spaces, others, offset):
+        """
+        This function finds the spaces contained in another one. Among equal spaces the first one is kept.
+
+        :param spaces: ndarray of spaces, one per row.
+        :param others: ndarray of the spaces to compare with, one per row, including the given ones from the offset.
+        :param offset: row of the others in which the given spaces start.
+        :return: boolean ndarray, True for the contained spaces.
+        """
+        if not len(spaces):
+            return np.zeros(0, dtype=bool)
+        contained = (others[None, :, :3] <= spaces[:, None, :3]).all(axis=2) \
+                    & (spaces[:, None, 3:] <= others[None, :, 3:]).all(axis=2)
+        equal = (others[None, :, :] == spaces[:, None, :]).all(axis=2)
+        rows = np.arange(len(spaces))[:, None] + offset
+        return (contained & (~equal | (np.arange(len(others))[None, :] < rows))).any(axis=1)
+
+    def getCorners(self, spaces, dims=(0, 0, 0), tolerance=0.0016):
+        """
+        This function gets the candidate corners of some spaces for a box. The corners are anchored on the floor or on
+        the top plane of each placed item under the bottom of a space, at the front left of the part of the space over
+        it, and also at its right side if the space is next to the right wall.
+
+        :param spaces: ndarray of spaces, one per row.
+        :param dims: width, height and length of the box, which must fit in the space from the corner.
+        :param tolerance: maximum distance between the bottom of a space and the top plane under it.
+        :return: ndarray of unique cartesian points sorted lexicographically, one per row.
+        """
+        # The floor is a support with no bounds in width and length.
+        mins = np.vstack((np.full((1, 3), -np.inf), self.store.mins[:self.store.size]))[None, :, :]
+        maxs = np.vstack((np.array([[np.inf, 0, np.inf]]), self.store.maxs[:self.store.size]))[None, :, :]
+        s = spaces[:, None, :]
+        resting = (maxs[:, :, 1] <= s[:, :, 1]) & (s[:, :, 1] - maxs[:, :, 1] <= tolerance) \
+                  & (np.minimum(s[:, :, 3], maxs[:, :, 0]) > np.maximum(s[:, :, 0], mins[:, :, 0])) \
+                  & (np.minimum(s[:, :, 5], maxs[:, :, 2]) > np.maximum(s[:, :, 2], mins[:, :, 2]))
+        spaceRows, supportRows = np.nonzero(resting)
+        spaces = spaces[spaceRows]
+        anchors = np.column_stack((np.maximum(spaces[:, 0], mins[0, supportRows, 0]), spaces[:, 1],
+                                   np.maximum(spaces[:, 2], mins[0, supportRows, 2])))
+        fitting = ((spaces[:, 3:] - anchors) >= dims).all(axis=1)
+        # Next to the right wall the box is shifted to the left from the corner.
+        rightAnchors = np.column_stack((spaces[:, 3], anchors[:, 1:]))
+        rightFitting = (spaces[:, 3] >= self.truckWidth - self.minDim) & (spaces[:, 3] - spaces[:, 0] >= dims[0]) \
+                       & ((spaces[:, 4:] - anchors[:, 1:]) >= dims[1:]).all(axis=1)
+        corners = np.vstack((anchors[fitting], rightAnchors[rightFitting]))
+        if self.unit:
+            # Rounded down to the grid of the coordinate unit, as the potential points of the corner engine are.
+            corners = np.floor(corners / self.unit + 0.000001) / round(1 / self.unit)
+        return np.unique(corners, axis=0) if len(corners) else corners.reshape(-1, 3)
+
+    def getSupportedMask(self, corners, dims, tolerance=0.0151):
+        """
+        This function finds the corners in which a box could be stable, those on the floor or in which the top planes
+        of the placed items right under the bottom of the box cover enough of it.
+
+        :param corners: ndarray of cartesian points, one per row.
+        :param dims: width, height and length of the box.
+        :param tolerance: maximum distance between the bottom of the box and a top plane in contact with it.
+        :return: boolean ndarray, True for the corners in which the box could be stable.
+        """
+        if not self.minContactArea:
+            return np.ones(len(corners), dtype=bool)
+        supported = corners[:, 1] <= 0
+        if supported.all() or not self.store.size:
+            return supported
+        mins, maxs = self.store.mins[None, :self.store.size], self.store.maxs[None, :self.store.size]
+        p = corners[~supported]
+        # Same shift to the left as the mass center of the items next to the right wall.
+        x = np.where((self.truckWidth - self.minDim <= p[:, 0]) & (p[:, 0] <= self.truckWidth), p[:, 0] - dims[0],
+                     p[:, 0])[:, None]
+        z = p[:, 2][:, None]
+        inContact = np.abs(maxs[:, :, 1] - p[:, 1][:, None]) <= tolerance
+        overlapX = np.maximum(np.minimum(maxs[:, :, 0], x + dims[0]) - np.maximum(mins[:, :, 0], x), 0)
+        overlapZ = np.maximum(np.minimum(maxs[:, :, 2], z + dims[2]) - np.maximum(mins[:, :, 2], z), 0)
+        contactArea = (inContact * overlapX * overlapZ).sum(axis=1)
+        supported[~supported] = contactArea >= self.minContactArea * dims[0] * dims[2] * (1 - 0.000001)
+        return supported
+
+    def getZoneMask(self, dstCode):
+        """
+        This function finds the spaces offered to a destination.
+
+        :param dstCode: destination.
+        :return: boolean ndarray, True for the spaces starting within the depth of the destination.
+        """
+        dstCodes = [dstCode] if self.stage < 2 else list(range(max(dstCode - 1, 0), min(dstCode + 2, len(self.zones))))
+        zones = self.zones[dstCodes]
+        zones = zones[~np.isnan(zones[:, 0])]
+        if not len(zones):
+            return np.ones(len(self.spaces), dtype=bool)
+        depths = self.spaces[:, 2][:, None]
+        return ((zones[:, 0] - 2 * self.gap <= depths) & (depths <= zones[:, 1] + 2 * self.gap)).any(axis=1)
+
+    def getPointsFor(self, item):
+        """
+        This function gets the candidate points of an item, the corners of the spaces of its destination it fits in
+        that are supported from below.
+
+        :param item: item object.
+        :return: ndarray of cartesian points, one per row.
+        """
+        dims = np.array([item["width"], item["height"], item["length"]])
+        fitting = ((self.spaces[:, 3:] - self.spaces[:, :3]) >= dims).all(axis=1) & self.getZoneMask(item["dstCode"])
+        corners = self.getCorners(self.spaces[fitting], dims)
+        return corners[self.getSupportedMask(corners, dims)]
+
+    def place(self, item, point):
+        """
+        This function carves an item placed in one of the points out of the spaces, before it is added to the placed
+        items and to the indexes of the container.
+
+        :param item: placed item object.
+        :param point: cartesian point in which the item is inserted.
+        :return: ndarray with the corners of the new spaces.
+        """
+        # The item is not in the store yet, the corners on top of it are offered once it is.
+        return self.getCorners(self.carve(item))
+
+    def getPointsByDst(self):
+        """
+        This function gets the corners of the spaces offered to each destination.
+
+        :return: list with an ndarray of points for each destination.
+        """
+        return list(map(lambda x: self.getCorners(self.spaces[self.getZoneMask(x)]), range(len(self.zones))))
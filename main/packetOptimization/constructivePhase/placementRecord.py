@@ -0,0 +1,63 @@
+"""
+This module contains the record of the placement of an item used in the feasibility checks of the constructive phase.
+"""
+
+# Keys of the item that describe its placement, mapped to the attributes of the record that keep them.
+PLACEMENT_KEYS = {"or": "orientation", "width": "width", "height": "height", "length": "length",
+                  "mass_center": "mass_center", "subzones": "subzones", "pp_in": "pp_in", "pp_out": "pp_out",
+                  "in_id": "in_id"}
+
+
+class PlacementRecord:
+    """
+    Placement of an item probed in a potential point. It is accessed as the item dictionary, but only the placement
+    state (orientation, dimensions, mass center, subzones and insertion data) is kept in the record, the rest of the
+    attributes are read from the item it was created from, which are not modified by the constructive phase.
+    """
+
+    __slots__ = ("item",) + tuple(PLACEMENT_KEYS.values())
+
+    def __init__(self, item, subzones):
+        """
+        :param item: item object, either a dictionary or another record, in the placement to be recorded.
+        :param subzones: subzones of the item in the placement.
+        """
+        self.item = item.item if isinstance(item, PlacementRecord) else item
+        self.orientation = item["or"]
+        self.width = item["width"]
+        self.height = item["height"]
+        self.length = item["length"]
+        self.mass_center = item["mass_center"]
+        self.subzones = subzones
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, PLACEMENT_KEYS[key])
+        except (KeyError, AttributeError):
+            return self.item[key]
+
+    def __setitem__(self, key, value):
+        if key not in PLACEMENT_KEYS:
+            raise KeyError("Only the placement of an item can be modified: " + key)
+        setattr(self, PLACEMENT_KEYS[key], value)
+
+    def __contains__(self, key):
+        return key in self.item or (key in PLACEMENT_KEYS and hasattr(self, PLACEMENT_KEYS[key]))
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def toDict(self):
+        """
+        This function builds the item dictionary of the placement.
+
+        :return: item object.
+        """
+        item = dict(self.item)
+        for key, attribute in PLACEMENT_KEYS.items():
+            if hasattr(self, attribute):
+                item[key] = getattr(self, attribute)
+        return item
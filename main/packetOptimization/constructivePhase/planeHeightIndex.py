@@ -0,0 +1,43 @@
+"""
+This module contains the index of the placed items by the height of their top plane.
+"""
+
+import math
+
+
+class PlaneHeightIndex:
+    """
+    Index of the placed items bucketed by the height of their top plane, so the items that may share a plane with
+    the bottom of a new item are found by visiting the buckets around its height instead of every placed item.
+    """
+
+    def __init__(self, bucketSize=0.0015):
+        """
+        :param bucketSize: height range in metres covered by each bucket.
+        """
+        self.bucketSize = bucketSize
+        self.buckets = {}
+
+    def add(self, index, topHeight, item):
+        """
+        This function adds a placed item to the bucket of its top plane height.
+
+        :param index: insertion index of the item.
+        :param topHeight: height of the top plane of the item.
+        :param item: placed item object.
+        """
+        self.buckets.setdefault(math.floor(topHeight / self.bucketSize), []).append((index, topHeight, item))
+
+    def query(self, height, tolerance):
+        """
+        This function gets the items whose top plane is within a tolerance of a given height.
+
+        :param height: height in metres.
+        :param tolerance: maximum distance between the height and the top planes.
+        :return: list of items in insertion order.
+        """
+        found = []
+        for key in range(math.floor((height - tolerance) / self.bucketSize),
+                         math.floor((height + tolerance) / self.bucketSize) + 1):
+            found.extend(filter(lambda x: abs(height - x[1]) <= tolerance, self.buckets.get(key, ())))
+        return list(map(lambda x: x[2], sorted(found, key=lambda x: x[0])))
@@ -0,0 +1,143 @@
+"""
+This module contains the store of the potential points of a destination used in the constructive phase.
+"""
+
+import bisect
+import heapq
+import itertools
+import math
+import numpy as np
+
+
+class PotentialPointStore:
+    """
+    Set of potential points hashed by their quantized coordinates. The points keep the order in which they were
+    added, as the rows of an array would, until the store is sorted, from then on they are kept sorted
+    lexicographically as they are added. A lazy heap gives the point closest to the front of the container and, on
+    equal depth, the farthest from its center in width.
+    """
+
+    def __init__(self, truckWidth, points=(), resolution=0.000001, snap=False):
+        """
+        :param truckWidth: width of the container, used for the ordering of the heap.
+        :param points: initial potential points, one per row.
+        :param resolution: size in metres of the grid used to quantize the coordinates.
+        :param snap: True to keep the points moved to the node of the grid below them in every axis, so equal keys
+        are equal points. The resolution must then divide a metre.
+        """
+        self.truckWidth = truckWidth
+        self.resolution = resolution
+        self.snap = snap
+        self.sequence = itertools.count()
+        # Quantized coordinates -> (sequence, point).
+        self.points = {}
+        self.heap = None
+        self.array = None
+        # Coordinates of the points sorted lexicographically, None until the store is sorted.
+        self.order = None
+        self.add(points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def __contains__(self, point):
+        return self.getKey(point) in self.points
+
+    def getKey(self, point):
+        """
+        This function gets the hash key of a point.
+
+        :param point: cartesian point.
+        :return: tuple with the quantized coordinates.
+        """
+        if self.snap:
+            # The points are corners of the items, already on the grid, or corners moved forward by the 0.0015 metres
+            # gap. Rounding down keeps a gap off the grid within the 0.0016 metres tolerance of the geometric checks.
+            return tuple(math.floor(c / self.resolution + 0.000001) for c in point)
+        return tuple(int(round(c / self.resolution)) for c in point)
+
+    def getPriority(self, point, sequence):
+        """
+        This function gets the ordering of a point in the heap.
+
+        :param point: cartesian point.
+        :param sequence: position in which the point was added.
+        :return: tuple with the depth, the negative distance to the center of the container in width and the order of
+        the point in the store.
+        """
+        order = sequence if self.order is None else tuple(point.tolist())
+        return point[2], -abs(point[0] - self.truckWidth / 2), order
+
+    def add(self, points):
+        """
+        This function adds the points that are not in the store yet, after the existing ones.
+
+        :param points: cartesian points, one per row.
+        """
+        for point in np.array(points, dtype=float).reshape(-1, 3):
+            key = self.getKey(point)
+            if key in self.points:
+                continue
+            if self.snap:
+                # Divided by the nodes per metre so the coordinates are the nearest floats to the nodes.
+                point = np.array(key) / round(1 / self.resolution)
+            sequence = next(self.sequence)
+            self.points[key] = (sequence, point)
+            if self.order is not None:
+                bisect.insort(self.order, tuple(point.tolist()))
+            if self.heap is not None:
+                heapq.heappush(self.heap, (*self.getPriority(point, sequence), sequence, key))
+            self.array = None
+
+    def remove(self, points):
+        """
+        This function removes the points that are in the store.
+
+        :param points: cartesian points, one per row.
+        """
+        for point in np.asarray(points, dtype=float).reshape(-1, 3):
+            removed = self.points.pop(self.getKey(point), None)
+            if removed is not None:
+                if self.order is not None:
+                    del self.order[bisect.bisect_left(self.order, tuple(removed[1].tolist()))]
+                self.array = None
+
+    def sort(self):
+        """
+        This function sorts the points lexicographically by their coordinates, and keeps them sorted as they are
+        added from then on.
+        """
+        if self.order is not None:
+            return
+        self.order = sorted(map(lambda x: tuple(x[1].tolist()), self.points.values()))
+        self.heap = None
+        self.array = None
+
+    def getPoints(self):
+        """
+        This function gets the points in the order of the store.
+
+        :return: ndarray with the points, one per row.
+        """
+        if self.array is None:
+            points = [point for _, point in self.points.values()] if self.order is None else self.order
+            self.array = np.array(points, dtype=float).reshape(-1, 3)
+        return self.array
+
+    def getLowest(self):
+        """
+        This function gets the point with the lowest depth and, on equal depth, the farthest from the center of the
+        container in width. Ties are resolved by the order of the store.
+
+        :return: cartesian point, None if the store is empty.
+        """
+        if self.heap is None:
+            self.heap = [(*self.getPriority(point, sequence), sequence, key)
+                         for key, (sequence, point) in self.points.items()]
+            heapq.heapify(self.heap)
+        while self.heap:
+            sequence, key = self.heap[0][-2:]
+            if key in self.points and self.points[key][0] == sequence:
+                return self.points[key][1]
+            heapq.heappop(self.heap)
+        return None
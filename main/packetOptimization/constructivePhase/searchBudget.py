@@ -0,0 +1,106 @@
+"""
+This module contains the budget of wall-clock time and feasibility evaluations of the constructive phase.
+"""
+
+import math
+import time
+import numpy as np
+
+
+class SearchBudget:
+    """
+    Wall-clock time and number of feasibility evaluations the constructive phase can spend, split among its stages.
+    Each stage can spend up to the sum of its share and those of the previous stages, so the part a stage does not use
+    is left to the next ones. In the second half of the part of a stage, the options scanned for each insertion are
+    reduced as its end approaches, and once it is spent the rest of the items of the stage are not evaluated.
+    """
+
+    def __init__(self, seconds=0, evaluations=0, shares=(0.15, 0.55, 0.3), minWindow=8):
+        """
+        :param seconds: wall-clock time in seconds, 0 for no limit.
+        :param evaluations: number of feasibility evaluations, 0 for no limit.
+        :param shares: part of the budget of each stage, in order of stage.
+        :param minWindow: minimum number of options scanned for an insertion.
+        """
+        self.seconds = seconds
+        self.evaluations = evaluations
+        self.shares = shares
+        self.minWindow = minWindow
+        self.startTime = time.perf_counter()
+        self.spent = 0
+        # Used part of the budget in which the current stage starts and ends.
+        self.stageStart, self.stageEnd = 0, shares[0]
+        # True once a stage has run out of its part.
+        self.exhausted = False
+        # True once the options scanned for an insertion have been reduced.
+        self.narrowed = False
+
+    def getUsedFraction(self):
+        """
+        This function gets the part of the budget used, the largest of those of the time and the evaluations.
+
+        :return: used fraction, greater than 1 if the budget has been exceeded.
+        """
+        fractions = [0]
+        if self.seconds:
+            fractions.append((time.perf_counter() - self.startTime) / self.seconds)
+        if self.evaluations:
+            fractions.append(self.spent / self.evaluations)
+        return max(fractions)
+
+    def startStage(self, stage):
+        """
+        This function starts the part of the budget of a stage.
+
+        :param stage: packing stage of the algorithm.
+        """
+        self.stageStart = min(self.getUsedFraction(), 1)
+        self.stageEnd = sum(self.shares[:stage + 1])
+
+    def spend(self, evaluations=1):
+        """
+        This function records some feasibility evaluations.
+
+        :param evaluations: number of evaluations.
+        """
+        self.spent += evaluations
+
+    def isStageExhausted(self):
+        """
+        This function checks whether the current stage has spent its part of the budget.
+
+        :return: True if it has, False otherwise.
+        """
+        if self.getUsedFraction() >= self.stageEnd:
+            self.exhausted = True
+            return True
+        return False
+
+    def getWindow(self, size):
+        """
+        This function gets how many options are scanned out of some, all of them in the first half of the part of the
+        current stage and decreasing linearly down to the minimum window at its end.
+
+        :param size: number of options.
+        :return: number of options to be scanned.
+        """
+        length = self.stageEnd - self.stageStart
+        progress = (self.getUsedFraction() - self.stageStart) / length if length > 0 else 1
+        if progress <= 0.5:
+            return size
+        window = min(size, max(self.minWindow, math.ceil(size * 2 * (1 - progress))))
+        self.narrowed = self.narrowed or window < size
+        return window
+
+    def getWindowOf(self, points):
+        """
+        This function reduces some points to the window of the current stage, keeping those closest to the front of
+        the container in their order.
+
+        :param points: ndarray of cartesian points, one per row.
+        :return: ndarray of cartesian points, one per row.
+        """
+        window = self.getWindow(len(points))
+        if window >= len(points):
+            return points
+        return points[np.sort(np.argsort(points[:, 2], kind="stable")[:window])]
@@ -0,0 +1,124 @@
+"""
+This module contains the uniform grid used as a broadphase for the overlapping checks of the constructive phase.
+"""
+
+import math
+import numpy as np
+
+
+class SpatialGrid:
+    """
+    Uniform grid over the container. Each cell keeps the insertion indexes of the placed items whose boxes
+    cross it, so the items that may intersect a box are found by visiting only the cells the box crosses.
+    """
+
+    def __init__(self, width, height, length, cellSize):
+        """
+        :param width: width of the container.
+        :param height: height of the container.
+        :param length: length of the container.
+        :param cellSize: edge of the cubic cells in metres.
+        """
+        self.cellSize = cellSize
+        self.shape = (max(1, math.ceil(width / cellSize)),
+                      max(1, math.ceil(height / cellSize)),
+                      max(1, math.ceil(length / cellSize)))
+        self.cells = {}
+        # Position of the cell and insertion index of every registration, in insertion order.
+        self.entries = []
+        # Cells flattened in two arrays, the start of each cell and the indexes of all of them, built when queried.
+        self.starts, self.indexes = None, None
+
+    def getCellRange(self, blf, trr):
+        """
+        This function gets the range of cells crossed by a box, clipped to the container.
+
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+        :param trr: cartesian coordinates of the Top-Right-Rear corner of the box.
+        :return: list of (first, last) cell indexes for each axis.
+        """
+        return [(min(max(int(blf[a] // self.cellSize), 0), self.shape[a] - 1),
+                 min(max(int(trr[a] // self.cellSize), 0), self.shape[a] - 1)) for a in range(3)]
+
+    def insert(self, index, blf, trr):
+        """
+        This function registers a box in every cell it crosses.
+
+        :param index: insertion index of the item.
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+        :param trr: cartesian coordinates of the Top-Right-Rear corner of the box.
+        """
+        (x0, x1), (y0, y1), (z0, z1) = self.getCellRange(blf, trr)
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                for k in range(z0, z1 + 1):
+                    self.cells.setdefault((i, j, k), []).append(index)
+                    self.entries.append((self.getCellId(i, j, k), index))
+        self.starts, self.indexes = None, None
+
+    def getCellId(self, i, j, k):
+        """
+        This function gets the position of a cell in the flattened grid.
+
+        :param i: cell index in the x-axis.
+        :param j: cell index in the y-axis.
+        :param k: cell index in the z-axis.
+        :return: position of the cell, the same type as the indexes given.
+        """
+        return (i * self.shape[1] + j) * self.shape[2] + k
+
+    def flatten(self):
+        """
+        This function builds the flattened cells, where the indexes of a cell are those between its start and the
+        start of the next cell.
+        """
+        entries = np.array(self.entries, dtype=np.int64).reshape(-1, 2)
+        counts = np.bincount(entries[:, 0], minlength=self.shape[0] * self.shape[1] * self.shape[2])
+        self.starts = np.concatenate(([0], np.cumsum(counts)))
+        self.indexes = entries[np.argsort(entries[:, 0], kind="stable"), 1]
+
+    def query(self, blf, trr):
+        """
+        This function gets the items whose boxes share at least one cell with a given box.
+
+        :param blf: cartesian coordinates of the Bottom-Left-Front corner of the box.
+        :param trr: cartesian coordinates of the Top-Right-Rear corner of the box.
+        :return: sorted list of insertion indexes.
+        """
+        (x0, x1), (y0, y1), (z0, z1) = self.getCellRange(blf, trr)
+        found = set()
+        for i in range(x0, x1 + 1):
+            for j in range(y0, y1 + 1):
+                for k in range(z0, z1 + 1):
+                    found.update(self.cells.get((i, j, k), ()))
+        return sorted(found)
+
+    def queryPairs(self, blfs, trrs):
+        """
+        This function gets at once, for a set of boxes, the items whose boxes share at least one cell with each of
+        them.
+
+        :param blfs: ndarray with the Bottom-Left-Front corners of the boxes, one per row.
+        :param trrs: ndarray with the Top-Right-Rear corners of the boxes, one per row.
+        :return: tuple of two ndarrays, the row of the box and the insertion index of the item of each pair, a pair
+        being repeated once for each cell they share.
+        """
+        if self.starts is None:
+            self.flatten()
+        last = np.array(self.shape) - 1
+        firsts = np.clip(np.floor_divide(blfs, self.cellSize).astype(np.int64), 0, last)
+        lasts = np.clip(np.floor_divide(trrs, self.cellSize).astype(np.int64), 0, last)
+        sides = lasts - firsts + 1
+        nCells = sides.prod(axis=1)
+        # Every cell crossed by every box, from the position of the cell within the range of its box.
+        boxes = np.repeat(np.arange(len(blfs)), nCells)
+        positions = np.arange(nCells.sum()) - np.repeat(np.cumsum(nCells) - nCells, nCells)
+        firsts, sides = firsts[boxes], sides[boxes]
+        cellIds = self.getCellId(firsts[:, 0] + positions // (sides[:, 1] * sides[:, 2]),
+                                 firsts[:, 1] + positions // sides[:, 2] % sides[:, 1],
+                                 firsts[:, 2] + positions % sides[:, 2])
+        # Every item of every cell, paired with the box crossing the cell.
+        starts, counts = self.starts[cellIds], self.starts[cellIds + 1] - self.starts[cellIds]
+        boxes = np.repeat(boxes, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return boxes, self.indexes[np.repeat(starts, counts) + offsets]
@@ -0,0 +1,67 @@
+"""
+This module contains the ledger of the weight loaded in each longitudinal subzone of the container.
+"""
+
+import numpy as np
+
+
+class SubzoneLedger:
+    """
+    Boundaries, current weights and weight limits of the subzones of the container kept in arrays, one position per
+    subzone in order of id. The subzone objects of the truck are updated with the weights added to the ledger.
+    """
+
+    def __init__(self, subzones):
+        """
+        :param subzones: subzone objects of the truck, with consecutive ids along the length of the container.
+        """
+        self.subzones = subzones
+        self.firstId = subzones[0]["id"]
+        self.starts = np.array(list(map(lambda x: x["blf"][2], subzones)), dtype=float)
+        self.ends = np.array(list(map(lambda x: x["brr"][2], subzones)), dtype=float)
+        self.weights = np.array(list(map(lambda x: x["weight"], subzones)), dtype=float)
+        self.limits = np.array(list(map(lambda x: x["weight_limit"], subzones)), dtype=float)
+
+    def getSplit(self, startZ, endZ):
+        """
+        This function splits a segment along the length of the container among the subzones it overlaps.
+
+        :param startZ: z-coordinate of the front of the segment.
+        :param endZ: z-coordinate of the rear of the segment.
+        :return: tuple with the ids of the subzones and the fraction of the segment in each of them.
+        """
+        overlaps = np.minimum(self.ends, endZ) - np.maximum(self.starts, startZ)
+        rows = np.flatnonzero(overlaps > 0)
+        return rows + self.firstId, overlaps[rows] / (endZ - startZ)
+
+    def getRows(self, ids):
+        """
+        This function gets the positions of subzones in the arrays.
+
+        :param ids: ids of the subzones.
+        :return: ndarray with the positions.
+        """
+        return np.asarray(ids, dtype=int) - self.firstId
+
+    def fitsContributions(self, ids, contributions):
+        """
+        This function checks for each subzone whether a contribution of weight keeps it within its limit.
+
+        :param ids: ids of the subzones.
+        :param contributions: weight added to each of the subzones.
+        :return: boolean ndarray, True for the subzones that do not exceed their limit.
+        """
+        rows = self.getRows(ids)
+        return self.weights[rows] + contributions <= self.limits[rows]
+
+    def addContributions(self, ids, contributions):
+        """
+        This function adds a contribution of weight to subzones.
+
+        :param ids: ids of the subzones.
+        :param contributions: weight added to each of the subzones.
+        """
+        rows = self.getRows(ids)
+        np.add.at(self.weights, rows, contributions)
+        for row in rows:
+            self.subzones[row]["weight"] = float(self.weights[row])
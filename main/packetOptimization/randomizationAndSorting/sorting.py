@@ -37,7 +37,7 @@ def reSortByFitness(nonPackedItems, maxWeight, packedItems, subgroupingCond, nDs
     """
     if subgroupingCond:
         # Get the subgroups that have been already packed.
-        packedSubgroups = list(map(lambda x: x["subgroupId"], packedItems))
+        packedSubgroups = set(map(lambda x: x["subgroupId"], packedItems))
         for i in nonPackedItems:
             # Simplification of conditions. From subgrouping to priority.
             if i["subgroupId"] in packedSubgroups:
@@ -54,7 +54,7 @@ def getIdFromFilePath(filepath):
 
 
 # -------------------- Main Processes -----------------------------
-def main_scenario(packets, coefficients, truck, nDst, nIteration, rangeOrientations=None):
+def main_scenario(packets, coefficients, truck, nDst, nIteration, rangeOrientations=None, timeBudget=0):
     if rangeOrientations is None:
         rangeOrientations = [1, 2, 3, 4, 5, 6]
     # ------ Packet adaptation------
@@ -66,7 +66,7 @@ def main_scenario(packets, coefficients, truck, nDst, nIteration, rangeOrientati
     rand_output = randomization(deepcopy(sort_output), nDst)
     # ------- Solution builder --------
     startTime = time.time()
-    iteration = main_cp(truck, rand_output, nDst, coefficients[2:])
+    iteration = main_cp(truck, rand_output, nDst, coefficients[2:], timeBudget=timeBudget)
     endTime = time.time()
     if iteration is None:
         return iteration
@@ -78,7 +78,8 @@ def main_scenario(packets, coefficients, truck, nDst, nIteration, rangeOrientati
             "sorted": sort_output,
             "rand": rand_output,
             "iteration": nIteration,
-            "time": str(endTime - startTime)}
+            "time": str(endTime - startTime),
+            "budgetExhausted": iteration["budgetExhausted"]}
 
 
 # ------------------ Translation of nested ndarrays -------------------
@@ -103,7 +104,9 @@ def serializeDiscardItem(item):
     :param item: item object.
     :return: item object with nested numpy arrays jsonified.
     """
-    item["mass_center"] = item["mass_center"].tolist()
+    # The items discarded without being evaluated, as those left once the time budget is spent, have no position.
+    if "mass_center" in item:
+        item["mass_center"] = item["mass_center"].tolist()
     if "subzones" in item:
         item["subzones"] = item["subzones"]
     return item
@@ -156,8 +159,13 @@ if len(sys.argv) > 1:
         particles = int(sys.argv[4])
     except ValueError:
         particles = 36
+    # Seconds each solution can take, 0 for no limit.
+    try:
+        timeBudget = float(sys.argv[5])
+    except (ValueError, IndexError):
+        timeBudget = 0
 else:
-    exp, cores, psoIterations, particles = 0, 23, 200, 34
+    exp, cores, psoIterations, particles, timeBudget = 0, 23, 200, 34, 0
 
 
 def processParticle(i, coefficients, nParticles, expID, packets, nDst, truck, genRun, bestPositions):
@@ -203,7 +211,7 @@ def computeAlgorithm(coefficients, expID, packets, nDst, truck, particleRun, sav
             client.log_metric(particleRun.info.run_id, "avgVolume", volume)
             client.log_metric(particleRun.info.run_id, "feasibleSols", sols)
     # ------ Iterations ------------
-    solutions = [main_scenario(deepcopy(packets), coefficients, deepcopy(truck), nDst, 0)]
+    solutions = [main_scenario(deepcopy(packets), coefficients, deepcopy(truck), nDst, 0, timeBudget=timeBudget)]
 
     # The has been no fair distribution.
     if solutions[0] is None:
@@ -45,7 +45,7 @@ def getIdFromFilePath(filepath):
 
 
 # -------------------- Main Processes -----------------------------
-def main_scenario(packets, truck, nDst, nIteration, coeffs, rangeOrientations=None):
+def main_scenario(packets, truck, nDst, nIteration, coeffs, rangeOrientations=None, timeBudget=0):
     if rangeOrientations is None:
         rangeOrientations = [1, 2, 3, 4, 5, 6]
     # ------ Packet adaptation------
@@ -57,7 +57,7 @@ def main_scenario(packets, truck, nDst, nIteration, coeffs, rangeOrientations=No
     rand_output = randomization(deepcopy(sort_output), nDst)
     # ------- Solution builder --------
     startTime = time.time()
-    iteration = main_cp(truck, rand_output, nDst, coeffs[2:])
+    iteration = main_cp(truck, rand_output, nDst, coeffs[2:], timeBudget=timeBudget)
     endTime = time.time()
     if iteration is None:
         return iteration
@@ -69,7 +69,8 @@ def main_scenario(packets, truck, nDst, nIteration, coeffs, rangeOrientations=No
             "sorted": sort_output,
             "rand": rand_output,
             "iteration": nIteration,
-            "time": str(endTime - startTime)}
+            "time": str(endTime - startTime),
+            "budgetExhausted": iteration["budgetExhausted"]}
 
 
 # ------------------ Translation of nested ndarrays -------------------
@@ -94,7 +95,9 @@ def serializeDiscardItem(item):
     :param item: item object.
     :return: item object with nested numpy arrays jsonified.
     """
-    item["mass_center"] = item["mass_center"].tolist()
+    # The items discarded without being evaluated, as those left once the time budget is spent, have no position.
+    if "mass_center" in item:
+        item["mass_center"] = item["mass_center"].tolist()
     if "subzones" in item:
         item["subzones"] = item["subzones"]
     return item
@@ -151,8 +154,14 @@ if len(sys.argv) > 1:
     except ValueError:
         expP2 = expP1 + 1
 
+    # Seconds each solution can take, 0 for no limit.
+    try:
+        timeBudget = float(sys.argv[5])
+    except (ValueError, IndexError):
+        timeBudget = 0
+
 else:
-    iterations, expP1, expP2, cores = 5, 2, 3, 1
+    iterations, expP1, expP2, cores, timeBudget = 5, 2, 3, 1, 0
 
 
 experiments = sorted(getFilepaths())
@@ -168,7 +177,8 @@ for i in range(expP1, expP2):
     with parallel_backend(backend="loky", n_jobs=cores):
         parallel = Parallel(verbose=100)
         solutions = parallel(
-            [delayed(main_scenario)(deepcopy(items), deepcopy(truck_var), ndst, i, coefficients) for i in range(iterations)])
+            [delayed(main_scenario)(deepcopy(items), deepcopy(truck_var), ndst, i, coefficients,
+                                     timeBudget=timeBudget) for i in range(iterations)])
         notNoneSolutions = list(filter(lambda x: x is not None, solutions))
         if len(notNoneSolutions):
             solutionsStats = list(map(lambda x: solutionStatistics(x), notNoneSolutions))
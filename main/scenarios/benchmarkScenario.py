@@ -0,0 +1,125 @@
+"""
+author: Yamil Mateo Rodríguez
+university: Universidad Politécnica de Madrid
+"""
+
+import json
+import time
+import sys
+import random
+from copy import deepcopy
+import numpy as np
+from main.truckAdapter.adapter import adaptTruck
+from main.packetAdapter.adapter import adaptPackets
+from main.packetOptimization.randomizationAndSorting.randomization import randomization
+from main.packetOptimization.randomizationAndSorting.sorting import sortingPhase
+from main.packetOptimization.constructivePhase.mainCP import main_cp
+import glob
+import os
+
+truck_var = json.load(open(os.path.dirname(__file__) + os.path.sep + "packetsDatasets" + os.path.sep + "truckvar.json"))
+
+
+# --------------- Packet Generator ------------------------------------------
+def getDataFromJSONWith(filepath):
+    """
+    This function gets a dataset file by its path.
+
+    :param filepath: path of the dataset.
+    :return: object mapped from json file and number of destinations.
+    """
+    nDst = int(filepath.split(os.path.sep)[-1].split("-")[5])
+    return json.load(open(filepath)), nDst
+
+
+def getFilepaths(rounds):
+    """
+    This function gets the paths of the datasets of some rounds of the article.
+
+    :param rounds: names of the folders of the rounds.
+    :return: sorted list of paths.
+    """
+    return sorted(sum(list(map(lambda x: glob.glob(
+        os.path.dirname(__file__) + os.path.sep + "packetsDatasets" + os.path.sep + "articleDatasets" + os.path.sep + x
+        + os.path.sep + "*.json"), rounds)), []))
+
+
+# -------------------- Main Processes -----------------------------
+def getSolutionFingerprint(solution):
+    """
+    This function summarizes the placement of a solution so two solutions can be compared.
+
+    :param solution: output of the solution builder.
+    :return: sorted list of tuples with the id, rounded mass center and dimensions of each placed item.
+    """
+    if solution is None:
+        return None
+    return sorted(map(lambda x: (x["id"], tuple(np.round(np.asarray(x["mass_center"], dtype=float), 6)), x["width"],
+                                 x["height"], x["length"]), solution["placed"]))
+
+
+def benchmark_scenario(packets, truck, nDst, coeffs, options, seed):
+    """
+    This function builds a solution for a dataset with some options of the solution builder.
+
+    :param packets: items of the dataset.
+    :param truck: truck object.
+    :param nDst: number of destinations.
+    :param coeffs: coefficients of the sorting phase and of the solution builder.
+    :param options: keyword arguments of the solution builder.
+    :param seed: seed of the randomization phase.
+    :return: tuple with the solution and the time spent by the solution builder in seconds.
+    """
+    random.seed(seed)
+    packets = adaptPackets(packets, 333)
+    truck = adaptTruck(truck, 4)
+    rand_output = randomization(deepcopy(sortingPhase(packets, nDst, coeffs[:2])), nDst)
+    startTime = time.time()
+    solution = main_cp(truck, rand_output, nDst, coeffs[2:], **options)
+    return solution, time.time() - startTime
+
+
+# ------------------ Benchmark ----------------------------------
+# Usage: benchmarkScenario.py [iterations] [first experiment] [last experiment]
+if len(sys.argv) > 1:
+    try:
+        iterations = int(sys.argv[1])
+    except ValueError:
+        iterations = 1
+
+    try:
+        expP1 = int(sys.argv[2])
+    except (ValueError, IndexError):
+        expP1 = 0
+
+    try:
+        expP2 = int(sys.argv[3])
+    except (ValueError, IndexError):
+        expP2 = expP1 + 1
+
+else:
+    iterations, expP1, expP2 = 1, 0, None
+
+experiments = getFilepaths(["round2", "round3pso"])
+
+coefficients = [0.23, 0.01, 0.7 , 0.86, 0.17, 0.8 , 0.76, 0.55, 0.3 , 0.92, 0.92, 0.33, 0.34, 0.75, 0.37, 0.6 , 0.79]
+
+# Options compared, the reference first.
+benchmarkOptions = {"exhaustive": {"bestFirstSearch": 0}, "bestFirst": {"bestFirstSearch": 1},
+                    "maximalSpaces": {"placementEngine": "ems"}}
+
+totalTimes = dict(map(lambda x: (x, 0), benchmarkOptions))
+for filepath in experiments[expP1:expP2]:
+    items, ndst = getDataFromJSONWith(filepath)
+    for i in range(iterations):
+        results = dict(map(lambda x: (x[0], benchmark_scenario(deepcopy(items), deepcopy(truck_var), ndst,
+                                                               coefficients, x[1], i)), benchmarkOptions.items()))
+        reference = getSolutionFingerprint(list(results.values())[0][0])
+        line = [filepath.split(os.path.sep)[-2] + os.path.sep + filepath.split(os.path.sep)[-1].split("-")[0], str(i)]
+        for name, (solution, elapsed) in results.items():
+            totalTimes[name] += elapsed
+            line.append(name + ": " + str(len(solution["placed"]) if solution else 0) + " placed " +
+                        str(round(elapsed, 2)) + "s " +
+                        ("same" if getSolutionFingerprint(solution) == reference else "DIFFERENT"))
+        print(" | ".join(line))
+print(" | ".join(map(lambda x: x[0] + " total: " + str(round(x[1], 2)) + "s", totalTimes.items())))
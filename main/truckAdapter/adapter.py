@@ -1,6 +1,12 @@
 import numpy as np
 from main.packetOptimization.constructivePhase.geometryHelpers import getTruckBLF
 from main.packetOptimization.constructivePhase.geometryHelpers import getTruckBRF
+from main.packetOptimization.constructivePhase.spatialGrid import SpatialGrid
+from main.packetOptimization.constructivePhase.placedItemStore import PlacedItemStore
+from main.packetOptimization.constructivePhase.heightMap import HeightMap
+from main.packetOptimization.constructivePhase.feasibilityCache import FeasibilityCache
+from main.packetOptimization.constructivePhase.planeHeightIndex import PlaneHeightIndex
+from main.packetOptimization.constructivePhase.subzoneLedger import SubzoneLedger
 
 
 # TODO, add distribution for each subzone
@@ -14,6 +20,12 @@ def setContainerSubzones(truck, nZones):
                    "brr": np.array([truck["width"], 0, (i + 1) * truck["length"] / nZones], dtype=float), "weight": 0,
                    "weight_limit": truck["tonnage"] / nZones}
         truck["subzones"].append(subzone)
+    return setContainerSubzoneLedger(truck)
+
+
+# This function creates the arrays with the boundaries, weights and weight limits of the subzones of the container.
+def setContainerSubzoneLedger(truck):
+    truck["subzoneLedger"] = SubzoneLedger(truck["subzones"])
     return truck
 
 
@@ -22,5 +34,36 @@ def setContainerPP(truck):
     return truck
 
 
+# This function creates the search structures of the container: the uniform grid used to find the placed items
+# around a box, the store with the boxes of the placed items, the index of the items by top plane height and the
+# cache of the feasibility checks that depend on the cargo underneath an item. With a coordinate unit the store
+# compares the boxes in integer units and the potential points are kept in the nodes of a grid of that size.
+def setContainerIndexes(truck, cellSize=0.5, unit=0):
+    truck["grid"] = SpatialGrid(truck["width"], truck["height"], truck["length"], cellSize)
+    truck["store"] = PlacedItemStore(unit=unit)
+    if unit:
+        truck["coordinateUnit"] = unit
+    else:
+        truck.pop("coordinateUnit", None)
+    truck["planeIndex"] = PlaneHeightIndex()
+    truck["feasibilityCache"] = FeasibilityCache()
+    return truck
+
+
+# This function creates the height map of the top surfaces of the cargo over the container floor.
+def setContainerHeightMap(truck, resolution):
+    truck["heightMap"] = HeightMap(truck["width"], truck["length"], resolution)
+    return truck
+
+
+# This function removes the search structures, the subzone ledger, the constraint pipeline and the search budget of the
+# container so the truck object can be serialized.
+def cleanContainerIndexes(truck):
+    for key in ["grid", "store", "planeIndex", "feasibilityCache", "heightMap", "subzoneLedger",
+                "constraintPipeline", "coordinateUnit", "searchBudget"]:
+        truck.pop(key, None)
+    return truck
+
+
 def adaptTruck(truck, nZones):
-    return setContainerPP(setContainerSubzones(truck, nZones))
+    return setContainerIndexes(setContainerPP(setContainerSubzones(truck, nZones)))
@@ -0,0 +1,50 @@
+"""
+Checks of the time and evaluation budgets of main_cp on cargos of several destinations.
+"""
+
+import glob
+import json
+import os
+import random
+from copy import deepcopy
+
+import numpy as np
+import pytest
+
+from main.truckAdapter.adapter import adaptTruck
+from main.packetAdapter.adapter import adaptPackets
+from main.packetOptimization.randomizationAndSorting.randomization import randomization
+from main.packetOptimization.randomizationAndSorting.sorting import sortingPhase
+from main.packetOptimization.constructivePhase.mainCP import main_cp
+
+DATASETS = os.path.join(os.path.dirname(__file__), os.pardir, "main", "scenarios", "packetsDatasets")
+COEFFICIENTS = [0.23, 0.01, 0.7, 0.86, 0.17, 0.8, 0.76, 0.55, 0.3, 0.92, 0.92, 0.33, 0.34, 0.75, 0.37, 0.6, 0.79]
+
+
+def getScenario(datasetId, seed):
+    """
+    This function prepares the truck and the sorted and randomized cargo of a dataset of round 2.
+
+    :param datasetId: id of the dataset, the start of its file name.
+    :param seed: seed of the random draws.
+    :return: truck object, list of items and number of destinations.
+    """
+    filepath = glob.glob(os.path.join(DATASETS, "articleDatasets", "round2", datasetId + "-*.json"))[0]
+    nDst = int(os.path.basename(filepath).split("-")[5])
+    random.seed(seed)
+    np.random.seed(seed)
+    packets = adaptPackets(json.load(open(filepath)), 333)
+    truck = adaptTruck(json.load(open(os.path.join(DATASETS, "truckvar.json"))), 4)
+    return truck, randomization(deepcopy(sortingPhase(packets, nDst, COEFFICIENTS[:2])), nDst), nDst
+
+
+@pytest.mark.parametrize("datasetId", ["23134347", "23134225"])
+@pytest.mark.parametrize("budget", [{"timeBudget": 0.1}, {"evaluationBudget": 200}, {"evaluationBudget": 1000}])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_budget_gives_partial_solution(datasetId, budget, seed):
+    truck, items, nDst = getScenario(datasetId, seed)
+    solution = main_cp(truck, items, nDst, COEFFICIENTS[2:], **budget)
+    assert solution is not None
+    assert solution["budgetExhausted"]
+    assert len(solution["placed"]) + len(solution["discard"]) == len(items)
+    assert len(solution["potentialPoints"]) == nDst